@@ -1,14 +1,38 @@
 #!/usr/bin/env python3
 
+import gc
 import time
 from pathlib import Path
 
-import tqdm
-
 import gerbonara
+from gerbonara.rs274x import GerberParser
+
+
+class LinearGerberParser(GerberParser):
+    """ Reference parser that tries every statement regex in turn, like gerbonara did before statements were
+    dispatched on their first character. """
+    STATEMENT_PREFIXES = {}
+
+
+def bench(parser_kls, data):
+    gc.collect()
+    start = time.perf_counter()
+    for filename, content in data:
+        parser_kls(gerbonara.GerberFile()).parse(content, filename=filename)
+    return time.perf_counter() - start
+
+
+def bench_parsers(data, *parser_classes, repeat=3):
+    """ Run the given parsers interleaved, and return the best time of each. """
+    times = [[] for _kls in parser_classes]
+    for _i in range(repeat):
+        for kls, l in zip(parser_classes, times):
+            l.append(bench(kls, data))
+    return [min(l) for l in times]
+
 
 if __name__ == '__main__':
-    resources = Path(__file__).parent.parent / 'gerbonara' / 'tests' / 'resources'
+    resources = Path(__file__).parent.parent / 'tests' / 'resources'
 
     TEST_FILES = [
         'easyeda/Gerber_TopSilkLayer.GTO',
@@ -52,9 +76,15 @@ if __name__ == '__main__':
         ]
 
     start = time.perf_counter()
-    for file in TEST_FILES: #tqdm.tqdm(TEST_FILES):
+    for file in TEST_FILES:
         gerbonara.GerberFile.open(resources / file)
     end = time.perf_counter()
 
     print(f'Duration: {(end - start)*1000:.3f} ms')
 
+    data = [(file, (resources / file).read_text()) for file in TEST_FILES]
+    t_linear, t_dispatch = bench_parsers(data, LinearGerberParser, GerberParser)
+    print(f'Parser only, trying all statement regexes: {t_linear*1000:.3f} ms')
+    print(f'Parser only, dispatching on first character: {t_dispatch*1000:.3f} ms')
+    print(f'Speedup: {t_linear/t_dispatch:.2f}x')
+
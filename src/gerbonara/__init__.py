@@ -29,6 +29,7 @@ from .rs274x import GerberFile
 from .excellon import ExcellonFile
 from .ipc356 import Netlist
 from .layers import LayerStack
+from .cache import ParseCache
 from .utils import MM, Inch
 from importlib.metadata import version
 
@@ -1,5 +1,5 @@
 
-from .parse import ApertureMacro, GenericMacros
+from .parse import ApertureMacro, CompiledMacro, GenericMacros
 from .expression import (Expression,
                         UnitExpression,
                         ConstantExpression,
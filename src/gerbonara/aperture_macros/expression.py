@@ -70,6 +70,11 @@ class Expression:
     def parameters(self):
         return tuple()
 
+    def to_python(self):
+        """ Return Python source code evaluating this expression. Macro parameters are looked up by their number in a
+        mapping named ``p``. Units are ignored, call :py:meth:`~.Expression.converted` first. """
+        raise NotImplementedError(f'{type(self).__name__} cannot be converted to Python')
+
     @property
     def _operator(self):
         return None
@@ -158,6 +163,9 @@ class UnitExpression(Expression):
     def parameters(self):
         return self.expr.parameters()
 
+    def to_python(self):
+        return self.expr.to_python()
+
 
 @dataclass(frozen=True, slots=True)
 class ConstantExpression(Expression):
@@ -177,6 +185,9 @@ class ConstantExpression(Expression):
             return '0'
         return f'{self.value:.6f}'.rstrip('0').rstrip('.')
 
+    def to_python(self):
+        return repr(float(self.value))
+
     
 @dataclass(frozen=True, slots=True)
 class VariableExpression(Expression):
@@ -202,6 +213,9 @@ class VariableExpression(Expression):
             num = register_variable(self.expr.converted(unit).optimized())
             return f'${num}'
 
+    def to_python(self):
+        return self.expr.to_python()
+
 @dataclass(frozen=True, slots=True)
 class ParameterExpression(Expression):
     ''' An expression that refers to a macro variable or parameter '''
@@ -219,6 +233,9 @@ class ParameterExpression(Expression):
     def to_gerber(self, register_variable=None, unit=None):
         return f'${self.number}'
 
+    def to_python(self):
+        return f'p[{self.number}]'
+
     def parameters(self):
         yield self
 
@@ -260,6 +277,9 @@ class NegatedExpression(Expression):
         else:
             return f'-({val_str})'
 
+    def to_python(self):
+        return f'(-{self.value.to_python()})'
+
 
 @dataclass(frozen=True, slots=True)
 class OperatorExpression(Expression):
@@ -373,6 +393,14 @@ class OperatorExpression(Expression):
 
         return f'{lval}{op}{rval}'
 
+    def to_python(self):
+        op = {operator.add: '+',
+              operator.sub: '-',
+              operator.mul: '*',
+              operator.truediv: '/'} [self.op]
+
+        return f'({self.l.to_python()} {op} {self.r.to_python()})'
+
     def parameters(self):
         yield from self.l.parameters()
         yield from self.r.parameters()
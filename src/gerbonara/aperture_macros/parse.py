@@ -10,10 +10,11 @@ import ast
 import copy
 import warnings
 import math
+from types import SimpleNamespace
 
 from . import primitive as ap
 from .expression import *
-from ..apertures import ApertureMacroInstance
+from ..apertures import ApertureMacroInstance, _canonical_value
 from ..utils import MM
 
 # we make our own here instead of using math.degrees to make sure this works with expressions, too.
@@ -56,6 +57,54 @@ def _parse_expression(expr, variables, parameters):
         raise SyntaxError('Invalid aperture macro expression') from e
     return _map_expression(parsed, variables, parameters)
 
+def _canonical_expression(value):
+    """ Normalize a field value of an aperture macro primitive for comparison and hashing, see
+    :py:class:`.ApertureMacro`. """
+    if isinstance(value, UnitExpression):
+        value = value.converted(MM).optimized()
+        return _canonical_value(value.value) if isinstance(value, ConstantExpression) else value
+    elif isinstance(value, Expression):
+        value = value.optimized()
+        return _canonical_value(value.value) if isinstance(value, ConstantExpression) else value
+    elif isinstance(value, tuple):
+        return tuple(map(_canonical_expression, value))
+    else:
+        return value
+
+class CompiledMacro:
+    """ Python function evaluating the fields of all primitives of an :py:class:`.ApertureMacro` for a given set of
+    parameters, returned by :py:meth:`.ApertureMacro.compiled`. Calling it with a sequence of parameter values returns
+    one object per primitive that has the primitive's field names as attributes, with each field's value as a
+    ``float``. Outline coordinates are returned as a ``tuple`` of ``float``.
+
+    Instances pickle as their source code, and are re-compiled when unpickled.
+    """
+
+    def __init__(self, source):
+        #: Python source code of this function
+        self.source = source
+        namespace = {'ns': SimpleNamespace, 'inf': math.inf, 'nan': math.nan}
+        exec(compile(source, '<aperture macro>', 'exec'), namespace)
+        self._function = namespace['evaluate']
+
+    @classmethod
+    def from_macro(kls, macro, unit=None):
+        fields = ''.join(f'        {primitive.to_python(unit)},\n' for primitive in macro.primitives)
+        return kls(f'def evaluate(p):\n    return (\n{fields}    )\n')
+
+    def __call__(self, parameters):
+        try:
+            return self._function(dict(enumerate(parameters, start=1)))
+        except KeyError as e:
+            raise IndexError(f'Cannot fully resolve aperture macro due to missing parameter ${e.args[0]}') from e
+
+    def __getstate__(self):
+        return self.source
+
+    def __setstate__(self, source):
+        self.__init__(source)
+
+
 @dataclass(frozen=True, slots=True)
 class ApertureMacro:
     """ Definition of an aperture macro in a Gerber file.
@@ -78,6 +127,9 @@ class ApertureMacro:
         
         Internally, the aperture macro API uses millimeters though most functions allow you to pass an unit parameter.
 
+        Like apertures, aperture macros compare equal when their primitives are the same after converting all lengths
+        to millimeters. Their names and comments are ignored for this.
+
         When you want to programmatically create aperture macros, we recommend using :py:meth:`~.ApertureMacro.map` on a
         dataclass-like class definition. Have a look at this code from :py:class:`~.GenericMacros`:
 
@@ -126,6 +178,25 @@ class ApertureMacro:
     primitives: tuple = ()
     comments: tuple = field(default=(), hash=False, compare=False)
     _param_dataclass: object = field(default=None, hash=False, compare=False)
+    _key: tuple = field(default=None, init=False, repr=False, hash=False, compare=False)
+    _compiled: dict = field(default=None, init=False, repr=False, hash=False, compare=False)
+
+    def _canonical_key(self):
+        # Like apertures, macros are compared by value independent of their name and of the units of their primitives.
+        if self._key is None:
+            object.__setattr__(self, '_key', (self.num_parameters, *(
+                (type(primitive), *(_canonical_expression(getattr(primitive, f.name))
+                                    for f in fields(primitive) if f.name != 'unit'))
+                for primitive in self.primitives)))
+        return self._key
+
+    def __eq__(self, other):
+        if not isinstance(other, ApertureMacro):
+            return NotImplemented
+        return self._canonical_key() == other._canonical_key()
+
+    def __hash__(self):
+        return hash(self._canonical_key())
 
     def __post_init__(self):
         if self.name is None or re.match(r'GNX[0-9A-F]{16}', self.name):
@@ -246,10 +317,22 @@ class ApertureMacro:
         variable_defs = [f'${num}={expr_str}' for expr_str, num in subexpression_variables.items()]
         return '*\n'.join(comments + variable_defs + primitive_defs)
 
+    def compiled(self, unit=None):
+        """ Return a :py:class:`.CompiledMacro` evaluating this macro's primitives in the given unit. The result is
+        cached, so that flashing the same macro many times only walks its expression trees once.
+
+        :param unit: :py:class:`.LengthUnit` to convert all lengths to. :py:obj:`None` keeps every primitive's own unit.
+        :rtype: :py:class:`.CompiledMacro`
+        """
+        if self._compiled is None:
+            object.__setattr__(self, '_compiled', {})
+        if (compiled := self._compiled.get(unit)) is None:
+            compiled = self._compiled[unit] = CompiledMacro.from_macro(self, unit)
+        return compiled
+
     def to_graphic_primitives(self, offset, rotation, parameters : [float], unit=None, polarity_dark=True):
-        parameters = dict(enumerate(parameters, start=1))
-        for primitive in self.primitives:
-            yield from primitive.to_graphic_primitives(offset, rotation, parameters, unit, polarity_dark)
+        for primitive, calc in zip(self.primitives, self.compiled(unit)(parameters)):
+            yield from primitive._graphic_primitives(calc, offset, rotation, polarity_dark)
 
     def rotated(self, angle):
         # aperture macro primitives use degree counter-clockwise, our API uses radians clockwise
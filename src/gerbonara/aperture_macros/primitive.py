@@ -72,6 +72,22 @@ class Primitive:
             if issubclass(field.type, Expression):
                 yield from getattr(self, field.name).parameters()
 
+    def to_graphic_primitives(self, offset, rotation, variable_binding={}, unit=None, polarity_dark=True):
+        with self.Calculator(self, variable_binding, unit) as calc:
+            return self._graphic_primitives(calc, offset, rotation, polarity_dark)
+
+    def to_python(self, unit=None):
+        """ Return Python source code evaluating all of this primitive's fields in the given unit, see
+        :py:meth:`.ApertureMacro.compiled`. The code passes the values as keyword arguments to a function named ``ns``
+        that returns an object with the same attributes as a :py:class:`.Calculator`. """
+        def convert(value):
+            if isinstance(value, tuple):
+                return '(' + ''.join(f'{convert(elem)}, ' for elem in value) + ')'
+            return value.converted(unit).optimized().to_python()
+
+        return 'ns(' + ', '.join(f'{field.name}={convert(getattr(self, field.name))}'
+                                 for field in fields(self) if field.name != 'unit') + ')'
+
     class Calculator:
         def __init__(self, instance, variable_binding={}, unit=None):
             self.instance = instance
@@ -85,7 +101,10 @@ class Primitive:
             pass
 
         def __getattr__(self, name):
-            return getattr(self.instance, name).calculate(self.variable_binding, self.unit)
+            value = getattr(self.instance, name)
+            if isinstance(value, tuple):
+                return tuple(self(elem) for elem in value)
+            return value.calculate(self.variable_binding, self.unit)
 
         def __call__(self, expr):
             return expr.calculate(self.variable_binding, self.unit)
@@ -101,15 +120,14 @@ class Circle(Primitive):
     y : UnitExpression = 0
     rotation : Expression = 0
 
-    def to_graphic_primitives(self, offset, rotation, variable_binding={}, unit=None, polarity_dark=True):
-        with self.Calculator(self, variable_binding, unit) as calc:
-            x, y = rotate_point(calc.x, calc.y, -(deg_to_rad(calc.rotation) + rotation), 0, 0)
-            x, y = x+offset[0], y+offset[1]
+    def _graphic_primitives(self, calc, offset, rotation, polarity_dark=True):
+        x, y = rotate_point(calc.x, calc.y, -(deg_to_rad(calc.rotation) + rotation), 0, 0)
+        x, y = x+offset[0], y+offset[1]
 
-            if math.isclose(calc.diameter, 0):
-                return []
+        if math.isclose(calc.diameter, 0):
+            return []
 
-            return [ gp.Circle(x, y, calc.diameter/2, polarity_dark=(bool(calc.exposure) == polarity_dark)) ]
+        return [ gp.Circle(x, y, calc.diameter/2, polarity_dark=(bool(calc.exposure) == polarity_dark)) ]
 
     def substitute_params(self, binding, unit):
         with self.Calculator(self, binding, unit) as calc:
@@ -136,23 +154,22 @@ class VectorLine(Primitive):
     end_y : UnitExpression
     rotation : Expression = 0
 
-    def to_graphic_primitives(self, offset, rotation, variable_binding={}, unit=None, polarity_dark=True):
-        with self.Calculator(self, variable_binding, unit) as calc:
-            center_x = (calc.end_x + calc.start_x) / 2
-            center_y = (calc.end_y + calc.start_y) / 2
-            delta_x = calc.end_x - calc.start_x
-            delta_y = calc.end_y - calc.start_y
-            length = point_distance((calc.start_x, calc.start_y), (calc.end_x, calc.end_y))
+    def _graphic_primitives(self, calc, offset, rotation, polarity_dark=True):
+        center_x = (calc.end_x + calc.start_x) / 2
+        center_y = (calc.end_y + calc.start_y) / 2
+        delta_x = calc.end_x - calc.start_x
+        delta_y = calc.end_y - calc.start_y
+        length = point_distance((calc.start_x, calc.start_y), (calc.end_x, calc.end_y))
 
-            center_x, center_y = rotate_point(center_x, center_y, -(deg_to_rad(calc.rotation) + rotation), 0, 0)
-            center_x, center_y = center_x+offset[0], center_y+offset[1]
-            rotation += deg_to_rad(calc.rotation) + math.atan2(delta_y, delta_x)
+        center_x, center_y = rotate_point(center_x, center_y, -(deg_to_rad(calc.rotation) + rotation), 0, 0)
+        center_x, center_y = center_x+offset[0], center_y+offset[1]
+        rotation += deg_to_rad(calc.rotation) + math.atan2(delta_y, delta_x)
 
-            if math.isclose(calc.width, 0):
-                return []
+        if math.isclose(calc.width, 0):
+            return []
 
-            return [ gp.Rectangle(center_x, center_y, length, calc.width, rotation=rotation,
-                        polarity_dark=(bool(calc.exposure) == polarity_dark)) ]
+        return [ gp.Rectangle(center_x, center_y, length, calc.width, rotation=rotation,
+                    polarity_dark=(bool(calc.exposure) == polarity_dark)) ]
 
     def substitute_params(self, binding, unit):
         with self.Calculator(self, binding, unit) as calc:
@@ -182,17 +199,16 @@ class CenterLine(Primitive):
     y : UnitExpression = 0
     rotation : Expression = 0
 
-    def to_graphic_primitives(self, offset, rotation, variable_binding={}, unit=None, polarity_dark=True):
-        with self.Calculator(self, variable_binding, unit) as calc:
-            rotation += deg_to_rad(calc.rotation)
-            x, y = gp.rotate_point(calc.x, calc.y, -rotation, 0, 0)
-            x, y = x+offset[0], y+offset[1]
-            w, h = calc.width, calc.height
+    def _graphic_primitives(self, calc, offset, rotation, polarity_dark=True):
+        rotation += deg_to_rad(calc.rotation)
+        x, y = gp.rotate_point(calc.x, calc.y, -rotation, 0, 0)
+        x, y = x+offset[0], y+offset[1]
+        w, h = calc.width, calc.height
 
-            if math.isclose(calc.width, 0) or math.isclose(calc.height, 0):
-                return []
+        if math.isclose(calc.width, 0) or math.isclose(calc.height, 0):
+            return []
 
-            return [ gp.Rectangle(x, y, w, h, rotation, polarity_dark=(bool(calc.exposure) == polarity_dark)) ]
+        return [ gp.Rectangle(x, y, w, h, rotation, polarity_dark=(bool(calc.exposure) == polarity_dark)) ]
 
     def substitute_params(self, binding, unit):
         with self.Calculator(self, binding, unit) as calc:
@@ -222,14 +238,12 @@ class Polygon(Primitive):
     diameter : UnitExpression
     rotation : Expression = 0
 
-    def to_graphic_primitives(self, offset, rotation, variable_binding={}, unit=None, polarity_dark=True):
-        with self.Calculator(self, variable_binding, unit) as calc:
-            rotation += deg_to_rad(calc.rotation)
-            x, y = rotate_point(calc.x, calc.y, -rotation, 0, 0)
-            x, y = x+offset[0], y+offset[1]
-            print('xy', calc.x, calc.y)
-            return [ gp.ArcPoly.from_regular_polygon(x, y, calc.diameter/2, int(calc.n_vertices), rotation,
-                        polarity_dark=(bool(calc.exposure) == polarity_dark)) ]
+    def _graphic_primitives(self, calc, offset, rotation, polarity_dark=True):
+        rotation += deg_to_rad(calc.rotation)
+        x, y = rotate_point(calc.x, calc.y, -rotation, 0, 0)
+        x, y = x+offset[0], y+offset[1]
+        return [ gp.ArcPoly.from_regular_polygon(x, y, calc.diameter/2, int(calc.n_vertices), rotation,
+                    polarity_dark=(bool(calc.exposure) == polarity_dark)) ]
 
     def dilated(self, offset, unit):
         return replace(self, diameter=self.diameter + UnitExpression(2*offset, unit))
@@ -256,26 +270,25 @@ class Moire(Primitive):
     crosshair_length : UnitExpression =0
     rotation : Expression = 0
 
-    def to_graphic_primitives(self, offset, rotation, variable_binding={}, unit=None, polarity_dark=True):
-        with self.Calculator(self, variable_binding, unit) as calc:
-            rotation += deg_to_rad(calc.rotation)
-            x, y = rotate_point(calc.x, calc.y, -rotation, 0, 0)
-            x, y = x+offset[0], y+offset[1]
+    def _graphic_primitives(self, calc, offset, rotation, polarity_dark=True):
+        rotation += deg_to_rad(calc.rotation)
+        x, y = rotate_point(calc.x, calc.y, -rotation, 0, 0)
+        x, y = x+offset[0], y+offset[1]
 
-            if math.isclose(calc.d_outer, 0):
-                return []
+        if math.isclose(calc.d_outer, 0):
+            return []
 
-            pitch = calc.line_thickness + calc.gap_w
-            for i in range(int(round(calc.num_circles))):
-                yield gp.Circle(x, y, calc.d_outer/2 - i*pitch, polarity_dark=True)
-                yield gp.Circle(x, y, calc.d_inner/2 - i*pitch - calc.line_thickness, polarity_dark=False)
+        pitch = calc.line_thickness + calc.gap_w
+        for i in range(int(round(calc.num_circles))):
+            yield gp.Circle(x, y, calc.d_outer/2 - i*pitch, polarity_dark=True)
+            yield gp.Circle(x, y, calc.d_inner/2 - i*pitch - calc.line_thickness, polarity_dark=False)
 
-            if math.isclose(calc.crosshair_thickness, 0, abs_tol=1e-6) or\
-                    math.isclose(calc.crosshair_length, 0, abs_tol=1e-6):
-                return
+        if math.isclose(calc.crosshair_thickness, 0, abs_tol=1e-6) or\
+                math.isclose(calc.crosshair_length, 0, abs_tol=1e-6):
+            return
 
-            yield gp.Rectangle(x, y, crosshair_length, crosshair_thickness, rotation=rotation, polarity_dark=True)
-            yield gp.Rectangle(x, y, crosshair_thickness, crosshair_length, rotation=rotation, polarity_dark=True)
+        yield gp.Rectangle(x, y, crosshair_length, crosshair_thickness, rotation=rotation, polarity_dark=True)
+        yield gp.Rectangle(x, y, crosshair_thickness, crosshair_length, rotation=rotation, polarity_dark=True)
 
     def dilate(self, offset, unit):
         # I'd rather print a warning and produce graphically slightly incorrect output in these few cases here than
@@ -303,23 +316,22 @@ class Thermal(Primitive):
     gap_w : UnitExpression
     rotation : Expression = 0
 
-    def to_graphic_primitives(self, offset, rotation, variable_binding={}, unit=None, polarity_dark=True):
-        with self.Calculator(self, variable_binding, unit) as calc:
-            rotation += deg_to_rad(calc.rotation)
-            x, y = rotate_point(calc.x, calc.y, -rotation, 0, 0)
-            x, y = x+offset[0], y+offset[1]
+    def _graphic_primitives(self, calc, offset, rotation, polarity_dark=True):
+        rotation += deg_to_rad(calc.rotation)
+        x, y = rotate_point(calc.x, calc.y, -rotation, 0, 0)
+        x, y = x+offset[0], y+offset[1]
 
-            dark = True
+        dark = True
 
-            if math.isclose(calc.d_outer, 0):
-                return []
+        if math.isclose(calc.d_outer, 0):
+            return []
 
-            return [
-                    gp.Circle(x, y, calc.d_outer/2, polarity_dark=dark),
-                    gp.Circle(x, y, calc.d_inner/2, polarity_dark=not dark),
-                    gp.Rectangle(x, y, calc.d_outer, calc.gap_w, rotation=rotation, polarity_dark=not dark),
-                    gp.Rectangle(x, y, calc.gap_w, calc.d_outer, rotation=rotation, polarity_dark=not dark),
-                    ]
+        return [
+                gp.Circle(x, y, calc.d_outer/2, polarity_dark=dark),
+                gp.Circle(x, y, calc.d_inner/2, polarity_dark=not dark),
+                gp.Rectangle(x, y, calc.d_outer, calc.gap_w, rotation=rotation, polarity_dark=not dark),
+                gp.Rectangle(x, y, calc.gap_w, calc.d_outer, rotation=rotation, polarity_dark=not dark),
+                ]
 
     def dilate(self, offset, unit):
         # I'd rather print a warning and produce graphically slightly incorrect output in these few cases here than
@@ -394,17 +406,17 @@ class Outline(Primitive):
         for expr in self.coords:
             yield from expr.parameters()
 
-    def to_graphic_primitives(self, offset, rotation, variable_binding={}, unit=None, polarity_dark=True):
-        with self.Calculator(self, variable_binding, unit) as calc:
-            rotation += deg_to_rad(calc.rotation)
-            bound_coords = [ rotate_point(calc(x), calc(y), -rotation, 0, 0) for x, y in self.points ]
-            bound_coords = [ (x+offset[0], y+offset[1]) for x, y in bound_coords ]
-            bound_radii = [None] * len(bound_coords)
+    def _graphic_primitives(self, calc, offset, rotation, polarity_dark=True):
+        rotation += deg_to_rad(calc.rotation)
+        coords = calc.coords
+        bound_coords = [ rotate_point(x, y, -rotation, 0, 0) for x, y in zip(coords[0::2], coords[1::2]) ]
+        bound_coords = [ (x+offset[0], y+offset[1]) for x, y in bound_coords ]
+        bound_radii = [None] * len(bound_coords)
 
-            if len(bound_coords) < 3:
-                return []
+        if len(bound_coords) < 3:
+            return []
 
-            return [gp.ArcPoly(bound_coords, bound_radii, polarity_dark=(bool(calc.exposure) == polarity_dark))]
+        return [gp.ArcPoly(bound_coords, bound_radii, polarity_dark=(bool(calc.exposure) == polarity_dark))]
 
     def dilated(self, offset, unit):
         # we would need a whole polygon offset/clipping library here
@@ -47,6 +47,19 @@ def _none_close(a, b):
     else:
         return False
 
+#: Apertures and aperture macros are compared after converting their dimensions to millimeters, and after rounding all
+#: numbers to this many digits after the decimal point.
+COMPARISON_DIGITS = 6
+
+def _canonical_value(value):
+    """ Round all floats in the given value for comparing and hashing apertures and aperture macros. """
+    if isinstance(value, float):
+        return round(value, COMPARISON_DIGITS)
+    elif isinstance(value, (tuple, list)):
+        return tuple(map(_canonical_value, value))
+    else:
+        return value
+
 class Length:
     """ Marker indicating that a dataclass field of an :py:class:`.Aperture` contains a physical length or coordinate
     measured in the :py:class:`.Aperture`'s native unit from :py:attr:`.Aperture.unit`.
@@ -56,12 +69,37 @@ class Length:
 
 @dataclass(frozen=True, slots=True)
 class Aperture:
-    """ Base class for all apertures. """
+    """ Base class for all apertures.
+
+    Apertures compare equal and have the same hash when they have the same type, dimensions and attributes. Dimensions
+    are converted to millimeters and rounded to :py:data:`COMPARISON_DIGITS` digits for this, so two apertures that
+    have the same size but are given in different units are equal. This makes apertures cheap to de-duplicate using
+    dicts or sets.
+    """
     _ : KW_ONLY
     unit: LengthUnit = None
     attrs: tuple = None
     original_number: int = field(default=None, hash=False, compare=False)
     _bounding_box: tuple = field(default=None, hash=False, compare=False)
+    _key: tuple = field(default=None, init=False, repr=False, hash=False, compare=False)
+    _templates: dict = field(default=None, init=False, repr=False, hash=False, compare=False)
+
+    def _canonical_key(self):
+        if self._key is None:
+            if self.unit is None:
+                params = [getattr(self, f.name) for f in fields(self) if not f.kw_only]
+            else:
+                params = self._params(MM)
+            object.__setattr__(self, '_key', (type(self), self.attrs, _canonical_value(params)))
+        return self._key
+
+    def __eq__(self, other):
+        if not isinstance(other, Aperture):
+            return NotImplemented
+        return self._canonical_key() == other._canonical_key()
+
+    def __hash__(self):
+        return hash(self._canonical_key())
 
     def _params(self, unit=None):
         out = []
@@ -85,9 +123,19 @@ class Aperture:
         :param LengthUnit unit: Physical length unit to use for the returned primitives.
         :param bool polarity_dark: Polarity of this flash. ``True`` renders this aperture as usual. ``False`` flips the polarity of all primitives.
 
+        Each aperture renders itself only once per unit and polarity at the origin, and caches the result. Flashes
+        are moved copies of these cached primitives.
+
         :returns: Rendered graphic primitivees.
         :rtype: list(:py:class:`.GraphicPrimitive`)
         """
+        if self._templates is None:
+            object.__setattr__(self, '_templates', {})
+        if (template := self._templates.get((unit, polarity_dark))) is None:
+            template = self._templates[unit, polarity_dark] = tuple(self._flash_primitives(0, 0, unit, polarity_dark))
+        return [prim.translated(x, y) for prim in template]
+
+    def _flash_primitives(self, x, y, unit=None, polarity_dark=True):
         return self._primitives(x, y, unit, polarity_dark)
 
     def bounding_box(self, unit=None):
@@ -121,7 +169,7 @@ class Aperture:
         """
         raise NotImplementedError()
 
-@dataclass(frozen=True, slots=True)
+@dataclass(frozen=True, slots=True, eq=False)
 class ExcellonTool(Aperture):
     """ Special Aperture_ subclass for use in :py:class:`.ExcellonFile`. Similar to :py:class:`.CircleAperture`, but
     does not have :py:attr:`.CircleAperture.hole_dia`, and has the additional :py:attr:`plated` attribute.
@@ -166,7 +214,7 @@ class ExcellonTool(Aperture):
         return (self.unit.convert_to(unit, self.diameter),)
 
 
-@dataclass(frozen=True, slots=True)
+@dataclass(frozen=True, slots=True, eq=False)
 class CircleAperture(Aperture):
     """ Besides flashing circles or rings, CircleApertures are used to set the width of a
     :py:class:`~.graphic_objects.Line` or :py:class:`~.graphic_objects.Arc`.
@@ -184,7 +232,7 @@ class CircleAperture(Aperture):
     def __str__(self):
         return f'<circle aperture d={self.diameter:.3} [{self.unit}]>'
 
-    flash = _flash_hole
+    _flash_primitives = _flash_hole
 
     def equivalent_width(self, unit=None):
         return self.unit.convert_to(unit, self.diameter)
@@ -215,7 +263,7 @@ class CircleAperture(Aperture):
                 self.unit.convert_to(unit, self.hole_dia))
 
 
-@dataclass(frozen=True, slots=True)
+@dataclass(frozen=True, slots=True, eq=False)
 class RectangleAperture(Aperture):
     """ Gerber rectangle aperture. Can only be used for flashes, since the line width of an interpolation of a rectangle
     aperture is not well-defined and there is no tool that implements it in a geometrically correct way. """
@@ -235,7 +283,7 @@ class RectangleAperture(Aperture):
     def __str__(self):
         return f'<rect aperture {self.w:.3}x{self.h:.3} [{self.unit}]>'
 
-    flash = _flash_hole
+    _flash_primitives = _flash_hole
 
     def equivalent_width(self, unit=None):
         return self.unit.convert_to(unit, math.sqrt(self.w**2 + self.h**2))
@@ -275,7 +323,7 @@ class RectangleAperture(Aperture):
                 self.unit.convert_to(unit, self.hole_dia))
 
 
-@dataclass(frozen=True, slots=True)
+@dataclass(frozen=True, slots=True, eq=False)
 class ObroundAperture(Aperture):
     """ Aperture whose shape is the convex hull of two circles of equal radii.
 
@@ -299,7 +347,7 @@ class ObroundAperture(Aperture):
     def __str__(self):
         return f'<obround aperture {self.w:.3}x{self.h:.3} [{self.unit}]>'
 
-    flash = _flash_hole
+    _flash_primitives = _flash_hole
 
     def dilated(self, offset, unit=MM):
         offset = self.unit(offset, unit)
@@ -343,7 +391,7 @@ class ObroundAperture(Aperture):
                 self.unit.convert_to(unit, self.hole_dia))
 
 
-@dataclass(frozen=True, slots=True)
+@dataclass(frozen=True, slots=True, eq=False)
 class PolygonAperture(Aperture):
     """ Aperture whose shape is a regular n-sided polygon (e.g. pentagon, hexagon etc.). Note that this only supports
     round holes.
@@ -375,7 +423,7 @@ class PolygonAperture(Aperture):
             return self
         return replace(self, diameter=self.diameter+2*offset, hole_dia=None)
 
-    flash = _flash_hole
+    _flash_primitives = _flash_hole
 
     @lru_cache()
     def rotated(self, angle=0):
@@ -410,7 +458,7 @@ class PolygonAperture(Aperture):
         else:
             return self.unit.convert_to(unit, self.diameter), self.n_vertices
 
-@dataclass(frozen=True, slots=True)
+@dataclass(frozen=True, slots=True, eq=False)
 class ApertureMacroInstance(Aperture):
     """ One instance of an aperture macro. An aperture macro defined with an ``AM`` statement can be instantiated by
     multiple ``AD`` aperture definition statements using different parameters. An :py:class:`.ApertureMacroInstance` is
@@ -457,6 +505,13 @@ class ApertureMacroInstance(Aperture):
                        parameters=tuple(),
                        macro=self.macro.substitute_params(self._params(unit), unit, macro_name))
 
+    def _canonical_key(self):
+        # The parameters can not be converted to millimeters since we do not know which of them are lengths.
+        if self._key is None:
+            object.__setattr__(self, '_key', (type(self), self.attrs, self.unit, self.macro,
+                                              _canonical_value(self.parameters)))
+        return self._key
+
     def _params(self, unit=None):
         # We ignore "unit" here as we convert the actual macro, not this instantiation.
         # We do this because here we do not have information about which parameter has which physical units.
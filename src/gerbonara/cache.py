@@ -0,0 +1,166 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2022 Jan Sebastian Götte <gerbonara@jaseg.de>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import os
+import pickle
+import hashlib
+import tempfile
+import warnings
+from pathlib import Path
+from importlib.metadata import version
+
+
+class ParseCache:
+    """ On-disk cache for parsed files. Pass an instance of this class as the ``cache`` argument of
+    :py:meth:`.GerberFile.open`, :py:meth:`.ExcellonFile.open` or :py:meth:`.LayerStack.open` to skip parsing files
+    that have been parsed before.
+
+    Entries are keyed by the SHA-256 hash of the file's content, the gerbonara version, the class the file is loaded as
+    and the arguments passed to its ``open`` method. The file's name and location do not matter, so entries are also
+    found for files extracted from a zip file to a different temporary directory each time. Each entry contains the
+    pickled parse result along with the warnings raised while parsing, which are re-raised when the entry is used.
+
+    Loading a file with ``compact=True`` (see :py:meth:`.GerberFile.compact`) makes entries both smaller and faster to
+    load.
+
+    When the total size of all entries exceeds ``max_size`` bytes, the least recently used entries are deleted.
+
+    .. note:: Entries are stored using :py:mod:`pickle`. Only point this at directories that no one else can write to.
+
+    :param directory: ``str`` or :py:class:`pathlib.Path` of the directory to store cache entries in. Created if it
+                      does not exist.
+    :param int max_size: Maximum total size of all cache entries in bytes.
+    """
+
+    SUFFIX = '.pickle'
+
+    def __init__(self, directory, max_size=1024*1024*1024):
+        self.directory = Path(directory)
+        self.max_size = max_size
+
+    def key(self, kls, data, *args, extra_data=(), **kwargs):
+        """ Calculate the cache key for loading the given file content as an instance of ``kls`` with the given
+        arguments.
+
+        :param kls: Class the file is loaded as, such as :py:class:`.GerberFile`.
+        :param bytes data: Content of the file.
+        :param extra_data: Iterable of :py:obj:`bytes` or :py:obj:`None` with the content of other files the result of
+                           parsing depends on. :py:obj:`None` stands for a file that does not exist.
+        :rtype: str
+        """
+        h = hashlib.sha256()
+        h.update(f'{version("gerbonara")}\0{kls.__module__}.{kls.__qualname__}\0{args!r}\0'.encode())
+        h.update(repr(sorted(kwargs.items())).encode())
+        for extra in [data, *extra_data]:
+            if extra is None:
+                h.update(b'\0absent')
+            else:
+                h.update(b'\0%d\0' % len(extra))
+                h.update(extra)
+        return h.hexdigest()
+
+    def _path(self, key):
+        return self.directory / f'{key}{self.SUFFIX}'
+
+    def load(self, key):
+        """ Return the cache entry with the given key as a ``(result, warnings)`` tuple, or :py:obj:`None` if there is
+        no such entry. Unreadable entries are deleted and treated as missing. """
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                entry = pickle.load(f)
+            # Entries are evicted in order of their modification time
+            os.utime(path)
+            return entry
+
+        except FileNotFoundError:
+            return None
+
+        except Exception as e:
+            warnings.warn(f'Ignoring unreadable cache entry {path}: {e}', RuntimeWarning)
+            path.unlink(missing_ok=True)
+            return None
+
+    def store(self, key, result, caught_warnings=()):
+        """ Store the given parse result and the warnings raised while producing it under the given key, then evict
+        the least recently used entries until the total size of all entries is below :py:attr:`max_size`. """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        # Write to a temporary file first so concurrent readers never see a partially written entry.
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump((result, list(caught_warnings)), f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, self._path(key))
+        except BaseException:
+            Path(tmp).unlink(missing_ok=True)
+            raise
+        self.evict()
+
+    def evict(self):
+        """ Delete the least recently used entries until the total size of all entries is below
+        :py:attr:`max_size`. """
+        entries = []
+        for path in self.directory.glob(f'*{self.SUFFIX}'):
+            try:
+                stat = path.stat()
+            except FileNotFoundError: # deleted concurrently
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _mtime, size, _path in entries)
+        for _mtime, size, path in sorted(entries, key=lambda entry: entry[0]):
+            if total <= self.max_size:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+
+    def clear(self):
+        """ Delete all entries from this cache. """
+        for path in self.directory.glob(f'*{self.SUFFIX}'):
+            path.unlink(missing_ok=True)
+
+    def open(self, kls, filename, *args, extra_files=(), **kwargs):
+        """ Load the given file using ``kls.open(filename, *args, **kwargs)``, or from the cache if it has been loaded
+        with the same arguments before.
+
+        :param kls: Class to load the file as, such as :py:class:`.GerberFile`.
+        :param filename: ``str`` or :py:class:`pathlib.Path` of the file to load.
+        :param extra_files: Paths of other files that ``kls.open`` reads in addition to ``filename``, such as
+                            parameter files next to an Excellon file.
+        """
+        filename = Path(filename)
+        extra_data = [ path.read_bytes() if path.is_file() else None for path in map(Path, extra_files) ]
+        key = self.key(kls, filename.read_bytes(), *args, extra_data=extra_data, **kwargs)
+
+        if (entry := self.load(key)) is not None:
+            result, caught = entry
+            for message, category, w_filename, lineno in caught:
+                warnings.warn_explicit(message, category, w_filename, lineno)
+            result.original_path = filename
+            return result
+
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            result = kls.open(filename, *args, **kwargs)
+
+        caught = [(w.message, w.category, w.filename, w.lineno) for w in caught]
+        self.store(key, result, caught)
+        for message, category, w_filename, lineno in caught:
+            warnings.warn_explicit(message, category, w_filename, lineno)
+        return result
+
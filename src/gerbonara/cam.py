@@ -29,6 +29,7 @@ from functools import cached_property
 from .utils import LengthUnit, MM, Inch, Tag, sum_bounds, setup_svg, convex_hull
 from . import graphic_primitives as gp
 from . import graphic_objects as go
+from . import columnar
 
 @dataclass
 class FileSettings:
@@ -174,6 +175,46 @@ class FileSettings:
             value = value + self._pad
             return float(value[:integer_digits] + '.' + value[integer_digits:])
 
+    def gerber_value_parser(self):
+        """ Return a function that parses numeric strings like :py:meth:`parse_gerber_value` does, specialized for this
+        file's current number format and zero suppression settings. For plain digit strings, the returned function
+        skips the string padding and slicing, and directly scales the integer value. Everything else is passed on to
+        :py:meth:`parse_gerber_value`.
+
+        Since the result of dividing two integers is correctly rounded, the returned values are identical to those of
+        :py:meth:`parse_gerber_value`. The returned function does not notice later changes to this object.
+        """
+        integer_digits, decimal_digits = self.number_format or (2, 5)
+        if integer_digits is None or decimal_digits is None:
+            return self.parse_gerber_value
+
+        fallback = self.parse_gerber_value
+        if self.zeros == 'leading':
+            divisor = 10**decimal_digits
+
+            def parse(value):
+                if not value:
+                    return None
+                if not value.isdecimal():
+                    return fallback(value)
+                return int(value) / divisor
+
+        else:
+            # Per value length, either the power of ten to multiply with, or the negative power of ten to divide by.
+            scales = [ 10**(integer_digits - n) if n <= integer_digits else -10**(n - integer_digits)
+                       for n in range(32) ]
+
+            def parse(value):
+                if not value:
+                    return None
+                if not value.isdecimal() or len(value) >= len(scales):
+                    return fallback(value)
+                if (scale := scales[len(value)]) > 0:
+                    return float(int(value) * scale)
+                return int(value) / -scale
+
+        return parse
+
     def write_gerber_value(self, value, unit=None):
         """ Convert a floating point number to a Gerber-formatted string.  """
 
@@ -205,6 +246,39 @@ class FileSettings:
 
         return sign + (num or '0')
 
+    def gerber_value_writer(self):
+        """ Return a function that formats numbers like :py:meth:`write_gerber_value` does, specialized for this file's
+        current number format and zero suppression settings. The returned function does not do unit conversion, its
+        argument must already be in this file's unit. It does not notice later changes to this object. """
+
+        integer_digits, decimal_digits = self.number_format or (2, 5)
+        if integer_digits is None:
+            integer_digits = 3
+        if decimal_digits is None:
+            decimal_digits = 3
+        spec = f'0{integer_digits+decimal_digits+1}.{decimal_digits}f'
+
+        # We deliberately keep formatting through format() here instead of scaling to an integer. Multiplying by a power
+        # of ten rounds differently in some edge cases, and we want the output to be identical to write_gerber_value.
+        if self.zeros == 'trailing':
+            def write(value):
+                num = format(abs(value), spec).replace('.', '').rstrip('0') or '0'
+                return '-' + num if value < 0 else num
+
+        elif self.zeros == 'leading':
+            def write(value):
+                num = format(abs(value), spec).replace('.', '').lstrip('0') or '0'
+                return '-' + num if value < 0 else num
+
+        else:
+            def write(value):
+                num = format(abs(value), spec).replace('.', '')
+                if not num.strip('0'):
+                    num = '0'
+                return '-' + num if value < 0 else num
+
+        return write
+
     def write_excellon_value(self, value, unit=None):
         """ Convert a floating point number to an Excellon-formatted string.  """
         if unit is not None:
@@ -300,11 +374,48 @@ class CamFile:
         return setup_svg(tags, bounds, margin=margin, arg_unit=arg_unit, svg_unit=svg_unit,
                 pagecolor=bg, tag=tag)
 
+    def to_raster(self, dpi=600, margin=0, arg_unit=MM, force_bounds=None):
+        """ Render this file into a bitmap. Call :py:meth:`.Raster.to_png` on the result to save it as a PNG file, or
+        :py:meth:`.Raster.render` to get the pixels as a numpy array. This requires numpy.
+
+        :param float dpi: Resolution in pixels per inch.
+        :param margin: Margin to add around the file's bounding box.
+        :param arg_unit: :py:class:`.LengthUnit` or str (``'mm'`` or ``'inch'``). Which unit ``margin`` and
+                         ``force_bounds`` are specified in. Default: mm
+        :param force_bounds: Render the area given as :py:obj:`((min_x, min_y), (max_x, max_y))` tuple instead of this
+                             file's bounding box.
+        :rtype: :py:class:`.Raster`
+        """
+        from .raster import Raster
+
+        if force_bounds:
+            (min_x, min_y), (max_x, max_y) = MM.convert_bounds_from(arg_unit, force_bounds)
+        else:
+            (min_x, min_y), (max_x, max_y) = self.bounding_box(MM, default=((0, 0), (0, 0)))
+        margin = MM(margin, arg_unit)
+        bounds = (min_x-margin, min_y-margin), (max_x+margin, max_y+margin)
+        return Raster((prim for obj in self.objects for prim in obj.to_primitives(MM)), bounds, dpi=dpi, unit=MM)
+
     def svg_objects(self, svg_unit=MM, fg='black', bg='white', aperture_map={}, tag=Tag):
+        yield from self._svg_objects(self.objects, svg_unit, fg, bg, aperture_map, tag)
+
+    @classmethod
+    def _svg_objects(kls, objects, svg_unit, fg, bg, aperture_map, tag):
         pl = None
-        for i, obj in enumerate(self.objects):
-            if isinstance(obj, go.Flash) and id(obj.aperture) in aperture_map:
-                yield tag('use', href='#'+aperture_map[id(obj.aperture)],
+        for obj in objects:
+            if isinstance(obj, go.StepRepeat):
+                if pl:
+                    yield pl.to_svg(fg, bg, tag=tag)
+                    pl = None
+
+                # Render the block's objects once, and reference them for all other instances.
+                group_id = f'sr-{id(obj):x}'
+                yield tag('g', list(kls._svg_objects(obj.objects, svg_unit, fg, bg, aperture_map, tag)), id=group_id)
+                for dx, dy in list(obj.instance_offsets(svg_unit))[1:]:
+                    yield tag('use', href='#'+group_id, x=f'{dx:.3f}', y=f'{dy:.3f}')
+
+            elif isinstance(obj, go.Flash) and obj.aperture in aperture_map:
+                yield tag('use', href='#'+aperture_map[obj.aperture],
                           x=f'{svg_unit(obj.x, obj.unit):.3f}',
                           y=f'{svg_unit(obj.y, obj.unit):.3f}')
 
@@ -349,6 +460,11 @@ class CamFile:
         :rtype: tuple
         """
 
+        try:
+            return columnar.bounding_box(self.objects, unit, default=default)
+        except ImportError: # numpy is not installed
+            pass
+
         return sum_bounds(( p.bounding_box(unit) for p in self.objects ), default=default)
 
     def convex_hull(self, tol=0.01, unit=None):
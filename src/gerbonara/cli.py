@@ -214,11 +214,17 @@ def render(inpath, theme, outfile):
               Each key must map to a string containing either a normal 6-digit hex color with leading hash sign, or an
               8-digit hex color with leading hash sign, where the last two digits set the layer's alpha value (opacity),
               with FF being completely opaque, and 00 being invisibly transparent.''')
+@click.option('--png', is_flag=True, help='''Render a PNG bitmap using the built-in rasterizer instead of exporting an
+              SVG file. This uses the same layers and colors as the default pseudo-realistic SVG render, and ignores
+              "--inkscape", "--no-filters" and "--drills". Requires numpy.''')
+@click.option('--dpi', type=float, default=600, help='Resolution of "--png" output in pixels per inch. Default: 600')
+@click.option('-j', '--workers', type=int, help='''Render "--png" output in this many worker processes. Default: render
+              in a single process.''')
 @click.argument('inpath', type=click.Path(exists=True))
-@click.argument('outfile', type=click.File('w'), default='-')
+@click.argument('outfile', type=click.File('wb'), default='-')
 def render(inpath, outfile, format_warnings, input_map, use_builtin_name_rules, force_zip, side, drills,
-           command_line_units, margin, force_bounds, inkscape, pretty, colorscheme):
-    """ Render a gerber file, or a directory or zip of gerber files into an SVG file. """
+           command_line_units, margin, force_bounds, inkscape, pretty, colorscheme, png, dpi, workers):
+    """ Render a gerber file, or a directory or zip of gerber files into an SVG or PNG file. """
 
     overrides = json.loads(input_map.read_bytes()) if input_map else None
     with warnings.catch_warnings():
@@ -235,6 +241,12 @@ def render(inpath, outfile, format_warnings, input_map, use_builtin_name_rules,
     if colorscheme:
         colorscheme = json.loads(colorscheme.read_text())
 
+    if png:
+        stack.to_png(outfile, side='bottom' if side == 'bottom' else 'top', dpi=dpi, margin=margin,
+                     arg_unit=(command_line_units or MM), force_bounds=force_bounds, colors=colorscheme,
+                     workers=workers)
+        return
+
     if pretty:
         svg = stack.to_pretty_svg(side='bottom' if side == 'bottom' else 'top', margin=margin,
                                               arg_unit=(command_line_units or MM),
@@ -242,7 +254,7 @@ def render(inpath, outfile, format_warnings, input_map, use_builtin_name_rules,
     else:
         svg = stack.to_svg(side_re=side or '.*', margin=margin, drills=drills, arg_unit=(command_line_units or MM),
                           svg_unit=MM, force_bounds=force_bounds, colors=colorscheme)
-    outfile.write(str(svg))
+    outfile.write(str(svg).encode())
 
 
 @cli.command()
@@ -359,6 +371,7 @@ def transform(transform, units, output_format, inpath, outpath, format_warnings,
         else:
             stack = lyr.LayerStack.open(inpath, overrides=overrides, autoguess=use_builtin_name_rules)
 
+    stack.compact()
     _apply_transform(transform, units, stack)
 
     output_format = None if output_format == 'reuse' else FileSettings.defaults()
@@ -428,7 +441,7 @@ def merge(inpath, outpath, offset, rotation, input_map, command_line_units, outp
         with warnings.catch_warnings():
             warnings.simplefilter(format_warnings)
 
-            stack = lyr.LayerStack.open(p, overrides=overrides, autoguess=use_builtin_name_rules)
+            stack = lyr.LayerStack.open(p, overrides=overrides, autoguess=use_builtin_name_rules).compact()
 
             if not math.isclose(offset[0], 0, abs_tol=1e-3) and math.isclose(offset[1], 0, abs_tol=1e-3):
                 stack.offset(*offset, command_line_units or MM)
@@ -0,0 +1,553 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2022 Jan Sebastian Götte <gerbonara@jaseg.de>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import math
+import copy
+from array import array
+from collections.abc import MutableSequence
+from dataclasses import fields
+from operator import attrgetter
+
+from .utils import MM, Inch, sum_bounds, to_unit
+from . import graphic_objects as go
+
+
+LINE, ARC, FLASH, OTHER = range(4)
+
+# Columns of the per-type tables, as (name, array type code) tuples.
+COLUMNS = {
+        LINE: (('x1', 'd'), ('y1', 'd'), ('x2', 'd'), ('y2', 'd'),
+               ('aperture', 'q'), ('polarity_dark', 'b'), ('inch', 'b')),
+        ARC: (('x1', 'd'), ('y1', 'd'), ('x2', 'd'), ('y2', 'd'), ('cx', 'd'), ('cy', 'd'), ('clockwise', 'b'),
+              ('aperture', 'q'), ('polarity_dark', 'b'), ('inch', 'b')),
+        FLASH: (('x', 'd'), ('y', 'd'),
+                ('aperture', 'q'), ('polarity_dark', 'b'), ('inch', 'b')),
+        }
+
+# Coordinate columns that are absolute positions, as (x, y) pairs. Arc centers are relative to the start point.
+POINTS = {
+        LINE: (('x1', 'y1'), ('x2', 'y2')),
+        ARC: (('x1', 'y1'), ('x2', 'y2')),
+        FLASH: (('x', 'y'),),
+        }
+
+_NUMPY_TYPES = {'d': 'f8', 'q': 'i8', 'b': 'i1'}
+
+
+class _ObjectView:
+    """ Mixin for the graphic object classes returned by :py:class:`.ColumnarObjects`. Instances of the resulting classes
+    do not store any data themselves, but read and write their fields from and to one row of their store. """
+
+    def __init_subclass__(cls):
+        # Intentionally does not chain up. GraphicObject.__init_subclass__ would overwrite the column properties of
+        # our subclasses with its field defaults.
+        pass
+
+    def __new__(cls, *args, **kwargs):
+        # dataclasses.replace and friends construct new objects through type(obj)(...). These should be plain objects.
+        return cls._base_class(*args, **kwargs)
+
+    @classmethod
+    def _make(kls, store, kind, row):
+        view = object.__new__(kls)
+        view.__dict__.update(_store=store, _kind=kind, _row=row)
+        return view
+
+    def __copy__(self):
+        return self._base_class(**{f.name: getattr(self, f.name) for f in fields(self)})
+
+    def __deepcopy__(self, memo):
+        return copy.deepcopy(self.__copy__(), memo)
+
+    def __reduce_ex__(self, protocol):
+        return self.__copy__().__reduce_ex__(protocol)
+
+
+def _column_property(name, convert):
+    def getter(self):
+        if self._store._transform is not None:
+            self._store._apply_transform()
+        return convert(self._store._columns[self._kind][name][self._row])
+
+    def setter(self, value):
+        if self._store._transform is not None:
+            self._store._apply_transform()
+        self._store._bounds.clear()
+        self._store._columns[self._kind][name][self._row] = value
+
+    return property(getter, setter)
+
+
+def _aperture_get(self):
+    index = self._store._columns[self._kind]['aperture'][self._row]
+    return None if index < 0 else self._store._apertures[index]
+
+def _aperture_set(self, value):
+    self._store._bounds.clear()
+    self._store._columns[self._kind]['aperture'][self._row] = self._store._aperture_index(value)
+
+def _unit_get(self):
+    return Inch if self._store._columns[self._kind]['inch'][self._row] else MM
+
+def _unit_set(self, value):
+    if value not in (MM, Inch):
+        raise ValueError(f'Objects in a columnar store must use either MM or Inch units, not {value}')
+    # Pending offsets are converted into each row's unit when they are applied.
+    self._store._apply_transform()
+    self._store._bounds.clear()
+    self._store._columns[self._kind]['inch'][self._row] = value == Inch
+
+def _attrs_get(self):
+    return self._store._attrs.setdefault((self._kind, self._row), {})
+
+def _attrs_set(self, value):
+    self._store._attrs[self._kind, self._row] = value
+
+
+def _make_view_class(kind, base):
+    ns = {'_base_class': base, '__module__': __name__,
+          'aperture': property(_aperture_get, _aperture_set),
+          'unit': property(_unit_get, _unit_set),
+          'attrs': property(_attrs_get, _attrs_set)}
+    for name, typecode in COLUMNS[kind]:
+        if name not in ns and name != 'inch':
+            ns[name] = _column_property(name, float if typecode == 'd' else bool)
+    return type(f'{base.__name__}View', (_ObjectView, base), ns)
+
+VIEW_CLASSES = {kind: _make_view_class(kind, base) for kind, base in
+                ((LINE, go.Line), (ARC, go.Arc), (FLASH, go.Flash))}
+
+_KINDS = {go.Line: LINE, go.Arc: ARC, go.Flash: FLASH, **{cls: kind for kind, cls in VIEW_CLASSES.items()}}
+
+
+class ColumnarObjects(MutableSequence):
+    """ Compact drop-in replacement for the list in :py:attr:`.GerberFile.objects`.
+
+    :py:class:`~.graphic_objects.Line`, :py:class:`~.graphic_objects.Arc` and :py:class:`.Flash` objects are stored in
+    one table per object type, with one typed array per field. Apertures are stored once in a shared table, and
+    attribute dicts are only stored for objects that actually have attributes. All other objects, such as
+    :py:class:`~.graphic_objects.Region`, are kept as they are.
+
+    Items are materialized lazily. Indexing or iterating returns a view object that is an instance of the usual graphic
+    object class, and that reads and writes its fields from and to the store. Copies of views (e.g. through
+    :py:meth:`.GraphicObject.converted` or :py:func:`dataclasses.replace`) are plain graphic objects.
+
+    :py:meth:`offset`, :py:meth:`rotate` and :py:meth:`scale` do not touch any rows. Instead, they are combined into one
+    pending affine transform that is applied to all rows at once the next time the coordinates are accessed. This
+    way, a chain of transforms only touches each coordinate once. :py:meth:`bounding_box` and applying pending
+    transforms operate on whole tables at once using numpy. Without numpy, transforms are applied row by row.
+    """
+
+    def __init__(self, objects=()):
+        self._kinds = array('b')
+        self._rows = array('q')
+        self._columns = { kind: {name: array(typecode) for name, typecode in cols} for kind, cols in COLUMNS.items() }
+        self._apertures = []
+        self._aperture_ids = {}
+        self._attrs = {}
+        self._bounds = {}
+        self._transform = None
+        self._others = []
+        self.extend(objects)
+
+    def __getstate__(self):
+        self._apply_transform()
+        state = dict(self.__dict__)
+        del state['_aperture_ids']
+        del state['_bounds']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._aperture_ids = {id(ap): i for i, ap in enumerate(self._apertures)}
+        self._bounds = {}
+
+    def _aperture_index(self, aperture):
+        if aperture is None:
+            return -1
+
+        if (index := self._aperture_ids.get(id(aperture))) is None:
+            index = self._aperture_ids[id(aperture)] = len(self._apertures)
+            self._apertures.append(aperture)
+        return index
+
+    def _store(self, obj):
+        # Pending transforms must not be applied to rows added after them.
+        self._apply_transform()
+        self._bounds.clear()
+        kind = _KINDS.get(type(obj), OTHER)
+        if kind == OTHER or obj.unit not in (MM, Inch):
+            self._others.append(obj)
+            return OTHER, len(self._others) - 1
+
+        try:
+            values = [ float(getattr(obj, name)) for name, typecode in COLUMNS[kind] if typecode == 'd' ]
+        except (TypeError, ValueError): # e.g. None coordinates
+            self._others.append(obj)
+            return OTHER, len(self._others) - 1
+
+        cols = self._columns[kind]
+        row = len(cols['aperture'])
+        values = iter(values)
+        for name, typecode in COLUMNS[kind]:
+            if name == 'aperture':
+                cols[name].append(self._aperture_index(obj.aperture))
+            elif name == 'inch':
+                cols[name].append(obj.unit == Inch)
+            elif typecode == 'd':
+                cols[name].append(next(values))
+            else:
+                cols[name].append(bool(getattr(obj, name)))
+
+        if (attrs := obj.attrs):
+            self._attrs[kind, row] = attrs
+        return kind, row
+
+    def _get(self, kind, row):
+        if kind == OTHER:
+            return self._others[row]
+        return VIEW_CLASSES[kind]._make(self, kind, row)
+
+    def __len__(self):
+        return len(self._kinds)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._get(self._kinds[i], self._rows[i]) for i in range(*index.indices(len(self)))]
+        return self._get(self._kinds[index], self._rows[index])
+
+    def __iter__(self):
+        for kind, row in zip(self._kinds, self._rows):
+            yield self._get(kind, row)
+
+    def __setitem__(self, index, value):
+        if isinstance(index, slice):
+            value = list(value)
+            start, stop, step = index.indices(len(self))
+            if step == 1:
+                del self[start:stop]
+                for i, obj in enumerate(value):
+                    self.insert(start+i, obj)
+                return
+
+            indices = range(start, stop, step)
+            if len(indices) != len(value):
+                raise ValueError(f'attempt to assign sequence of size {len(value)} to extended slice of size {len(indices)}')
+            for i, obj in zip(indices, value):
+                self[i] = obj
+            return
+
+        kind, row = self._store(value)
+        self._kinds[index] = kind
+        self._rows[index] = row
+
+    def __delitem__(self, index):
+        # Table rows of deleted items are not reclaimed.
+        self._bounds.clear()
+        del self._kinds[index]
+        del self._rows[index]
+
+    def clear(self):
+        self.__init__()
+
+    def insert(self, index, value):
+        kind, row = self._store(value)
+        self._kinds.insert(index, kind)
+        self._rows.insert(index, row)
+
+    def append(self, value):
+        kind, row = self._store(value)
+        self._kinds.append(kind)
+        self._rows.append(row)
+
+    def __add__(self, other):
+        return ColumnarObjects([*self, *other])
+
+    def __radd__(self, other):
+        return ColumnarObjects([*other, *self])
+
+    def __eq__(self, other):
+        if not isinstance(other, (list, ColumnarObjects)):
+            return NotImplemented
+        return list(self) == list(other)
+
+    def __repr__(self):
+        return f'<ColumnarObjects with {len(self)} objects>'
+
+    def _others_in_use(self):
+        return [ self._others[row] for kind, row in zip(self._kinds, self._rows) if kind == OTHER ]
+
+    def _numpy_columns(self, kind):
+        import numpy as np
+        return { name: np.frombuffer(self._columns[kind][name], dtype=_NUMPY_TYPES[typecode])
+                 for name, typecode in COLUMNS[kind] }
+
+    def map_apertures(self, fun):
+        """ Replace every aperture in this store by ``fun(aperture)``. ``fun`` is called once per distinct aperture. """
+        self._bounds.clear()
+        self._apertures = [ fun(ap) for ap in self._apertures ]
+        self._aperture_ids = {id(ap): i for i, ap in enumerate(self._apertures)}
+        for obj in self._others_in_use():
+            if isinstance(obj, go.StepRepeat):
+                obj.map_apertures(fun)
+            elif (aperture := getattr(obj, 'aperture', None)):
+                obj.aperture = fun(aperture)
+
+    def _compose(self, a, b, c, d, tx, ty):
+        """ Add the affine transform ``x, y -> a*x + b*y + tx, c*x + d*y + ty`` to the pending transform. ``tx`` and
+        ``ty`` are in millimeters. """
+        self._bounds.clear()
+        if self._transform is None:
+            self._transform = (a, b, c, d, tx, ty)
+            return
+
+        a2, b2, c2, d2, tx2, ty2 = self._transform
+        self._transform = (a*a2 + b*c2, a*b2 + b*d2,
+                           c*a2 + d*c2, c*b2 + d*d2,
+                           a*tx2 + b*ty2 + tx, c*tx2 + d*ty2 + ty)
+
+    def _apply_transform(self):
+        """ Apply the pending affine transform to all rows. """
+        if self._transform is None:
+            return
+
+        a, b, c, d, tx, ty = self._transform
+        self._transform = None
+        # Offsets in each row's unit
+        offsets = ((MM(tx, MM), MM(ty, MM)), (Inch(tx, MM), Inch(ty, MM)))
+
+        try:
+            import numpy as np
+        except ImportError: # numpy is not installed
+            for kind, points in POINTS.items():
+                cols = self._columns[kind]
+                for i, inch in enumerate(cols['inch']):
+                    dx, dy = offsets[inch]
+                    for x, y in points:
+                        cols[x][i], cols[y][i] = a*cols[x][i] + b*cols[y][i] + dx, c*cols[x][i] + d*cols[y][i] + dy
+                    if kind == ARC:
+                        cols['cx'][i], cols['cy'][i] = a*cols['cx'][i] + b*cols['cy'][i], c*cols['cx'][i] + d*cols['cy'][i]
+            return
+
+        for kind, points in POINTS.items():
+            cols = self._numpy_columns(kind)
+            inch = cols['inch'].astype(bool)
+            dx = np.where(inch, offsets[1][0], offsets[0][0])
+            dy = np.where(inch, offsets[1][1], offsets[0][1])
+            for x, y in points:
+                cols[x][:], cols[y][:] = a*cols[x] + b*cols[y] + dx, c*cols[x] + d*cols[y] + dy
+            if kind == ARC:
+                cols['cx'][:], cols['cy'][:] = a*cols['cx'] + b*cols['cy'], c*cols['cx'] + d*cols['cy']
+            # Release the numpy views, since array.array can't be resized while they exist.
+            del cols
+
+    def offset(self, dx=0, dy=0, unit=MM):
+        """ Like :py:meth:`.GraphicObject.offset`, but for all objects in this store. """
+        self._compose(1, 0, 0, 1, MM(dx, unit), MM(dy, unit))
+
+        for obj in self._others_in_use():
+            obj.offset(dx, dy, unit)
+
+    def rotate(self, angle, cx=0, cy=0, unit=MM):
+        """ Like :py:meth:`.GraphicObject.rotate`, but for all objects in this store. """
+        cos, sin = math.cos(-angle), math.sin(-angle)
+        cx, cy = MM(cx, unit), MM(cy, unit)
+        self._compose(cos, -sin, sin, cos, cx - cx*cos + cy*sin, cy - cx*sin - cy*cos)
+
+        for obj in self._others_in_use():
+            obj.rotate(angle, cx, cy, MM)
+
+    def scale(self, factor, unit=MM):
+        """ Like :py:meth:`.GraphicObject.scale`, but for all objects in this store. """
+        self._compose(factor, 0, 0, factor, 0, 0)
+
+        for obj in self._others_in_use():
+            obj.scale(factor)
+
+    def bounding_box(self, unit=None, default=None):
+        """ Vectorized version of :py:meth:`.CamFile.bounding_box`. Returns the same result as calling
+        :py:meth:`.GraphicObject.bounding_box` on every object and adding up the results.
+
+        The bounds of the tables are cached until the store is changed. Objects that are not stored in a table, such as
+        regions, can be changed without the store noticing, so their bounds are re-calculated on every call. """
+        unit = to_unit(unit)
+        if (bounds := self._bounds.get(unit)) is None:
+            import numpy as np
+            self._apply_transform()
+            # Only look at rows that are actually in use, ignoring the leftovers of deleted items.
+            kinds = np.array(self._kinds, dtype='i1')
+            rows = np.array(self._rows, dtype='i8')
+
+            bounds = []
+            for kind in POINTS:
+                used = rows[kinds == kind]
+                if len(used):
+                    cols = { name: col[used] for name, col in self._numpy_columns(kind).items() }
+                    bounds.append(_table_bounds(np, kind, cols, self._apertures, unit))
+            bounds = self._bounds[unit] = tuple(bounds)
+
+        return sum_bounds([*bounds, *(obj.bounding_box(unit) for obj in self._others_in_use())], default=default)
+
+
+def bounding_box(objects, unit=None, default=None):
+    """ Calculate the bounding box of the given graphic objects like :py:meth:`.CamFile.bounding_box` does, but using
+    vectorized operations for all :py:class:`~.graphic_objects.Line`, :py:class:`~.graphic_objects.Arc` and
+    :py:class:`.Flash` objects. Requires numpy.
+
+    :param objects: iterable of graphic objects
+    :param unit: :py:class:`.LengthUnit` to return results in. ``None`` to use each object's own unit.
+    :param default: Default value to return if there are no objects.
+    :returns: ``((x_min, y_min), (x_max, y_max))`` tuple of floats.
+    """
+    if isinstance(objects, ColumnarObjects):
+        return objects.bounding_box(unit, default=default)
+
+    import numpy as np
+    unit = to_unit(unit)
+    tables = { kind: ([], []) for kind in POINTS }
+    apertures, aperture_ids, others = [], {}, []
+    coords = { kind: [name for name, typecode in COLUMNS[kind] if typecode == 'd'] for kind in POINTS }
+    coords[ARC].append('clockwise')
+    getters = { kind: attrgetter(*names) for kind, names in coords.items() }
+
+    for obj in objects:
+        kind = _KINDS.get(type(obj))
+        if kind is None or ((obj_unit := obj.unit) is not MM and obj_unit is not Inch):
+            others.append(obj)
+            continue
+
+        if (aperture := obj.aperture) is None:
+            index = -1
+        elif (index := aperture_ids.get(id(aperture))) is None:
+            index = aperture_ids[id(aperture)] = len(apertures)
+            apertures.append(aperture)
+
+        objs, rows = tables[kind]
+        objs.append(obj)
+        rows.append((*getters[kind](obj), index, obj_unit is Inch))
+
+    bounds = []
+    for kind, (objs, rows) in tables.items():
+        if not rows:
+            continue
+
+        try:
+            table = np.array(rows, dtype=float)
+        except (TypeError, ValueError): # e.g. None coordinates
+            others.extend(objs)
+            continue
+
+        cols = { name: table[:, i] for i, name in enumerate([*coords[kind], 'aperture', 'inch']) }
+        cols['aperture'] = cols['aperture'].astype('i8')
+        bounds.append(_table_bounds(np, kind, cols, apertures, unit))
+
+    bounds.extend(obj.bounding_box(unit) for obj in others)
+    return sum_bounds(bounds, default=default)
+
+
+def _table_bounds(np, kind, cols, apertures, unit):
+    """ Calculate the bounding box of a non-empty table given as a dict of numpy arrays. """
+    inch = cols['inch'].astype(bool)
+    conv = lambda name: _convert(np, cols[name], inch, unit)
+    aperture_ids = cols['aperture']
+
+    if kind == FLASH:
+        if (aperture_ids < 0).any():
+            raise ValueError('Flash without aperture')
+        ap_bounds = np.zeros((len(apertures), 4))
+        for i in np.unique(aperture_ids).tolist():
+            (ap_bounds[i, 0], ap_bounds[i, 1]), (ap_bounds[i, 2], ap_bounds[i, 3]) = apertures[i].bounding_box(unit)
+        x, y = conv('x'), conv('y')
+        ap = ap_bounds[aperture_ids]
+        min_x, min_y, max_x, max_y = ap[:, 0] + x, ap[:, 1] + y, ap[:, 2] + x, ap[:, 3] + y
+
+    else:
+        no_aperture_width = 0.1 if kind == LINE else 0
+        widths = { i: apertures[i].equivalent_width(unit) if i >= 0 else no_aperture_width
+                   for i in np.unique(aperture_ids).tolist() }
+        lookup = np.array([widths.get(i, 0) for i in range(-1, len(apertures))], dtype=float)
+        r = lookup[aperture_ids + 1] / 2
+        x1, y1, x2, y2 = conv('x1'), conv('y1'), conv('x2'), conv('y2')
+
+        if kind == LINE:
+            min_x, min_y = np.minimum(x1, x2) - r, np.minimum(y1, y2) - r
+            max_x, max_y = np.maximum(x1, x2) + r, np.maximum(y1, y2) + r
+
+        else:
+            cx, cy = conv('cx') + x1, conv('cy') + y1
+            min_x, min_y, max_x, max_y = arc_bounds(np, x1, y1, x2, y2, cx, cy, cols['clockwise'].astype(bool))
+            min_x, min_y, max_x, max_y = min_x - r, min_y - r, max_x + r, max_y + r
+
+    return (float(min_x.min()), float(min_y.min())), (float(max_x.max()), float(max_y.max()))
+
+
+def _convert(np, values, inch, unit):
+    """ Convert values with per-row units into ``unit``, using the same arithmetic as
+    :py:meth:`.LengthUnit.convert_from`. """
+    if unit is None:
+        return values
+
+    out = values.copy()
+    other = inch != (unit == Inch)
+    src_mm = np.where(inch[other], Inch.this_in_mm, MM.this_in_mm)
+    out[other] = values[other] * src_mm / unit.this_in_mm
+    return out
+
+
+def _isclose(np, a, b):
+    """ Vectorized :py:func:`math.isclose` with default tolerances. """
+    return (a == b) | (np.abs(a - b) <= 1e-9 * np.maximum(np.abs(a), np.abs(b)))
+
+
+def arc_bounds(np, x1, y1, x2, y2, cx, cy, clockwise):
+    """ Vectorized version of :py:func:`.utils.arc_bounds` operating on numpy arrays. See there for an explanation of
+    the algorithm.
+
+    :returns: ``(min_x, min_y, max_x, max_y)`` tuple of arrays.
+    """
+    x1, x2 = x1 - cx, x2 - cx
+    y1, y2 = y1 - cy, y2 - cy
+    r = np.sqrt(x1**2 + y1**2)
+
+    p1_west, p1_north = x1 < 0, y1 > 0
+    p2_west, p2_north = x2 < 0, y2 > 0
+
+    min_x, min_y = np.minimum(x1, x2), np.minimum(y1, y2)
+    max_x, max_y = np.maximum(x1, x2), np.maximum(y1, y2)
+
+    # North/south halfplanes
+    crossing = p1_west != p2_west
+    towards = p1_west == clockwise
+    both = ~crossing & (((y1 > y2) != p1_west) != clockwise)
+    max_y = np.where((crossing & towards) | both, r, max_y)
+    min_y = np.where((crossing & ~towards) | both, -r, min_y)
+
+    # West/east halfplanes
+    crossing = p1_north != p2_north
+    towards = p1_north == clockwise
+    both = ~crossing & (((x1 < x2) == p1_north) != clockwise)
+    max_x = np.where((crossing & towards) | both, r, max_x)
+    min_x = np.where((crossing & ~towards) | both, -r, min_x)
+
+    # Special case: Gerber defines an arc with p1 == p2 as a full circle.
+    full = _isclose(np, x1, x2) & _isclose(np, y1, y2)
+    min_x, min_y = np.where(full, -r, min_x), np.where(full, -r, min_y)
+    max_x, max_y = np.where(full, r, max_x), np.where(full, r, max_y)
+
+    return min_x+cx, min_y+cy, max_x+cx, max_y+cy
+
@@ -32,6 +32,7 @@ from .cam import CamFile, FileSettings
 from .graphic_objects import Flash, Line, Arc
 from .apertures import ExcellonTool, CircleAperture
 from .utils import Inch, MM, to_unit, InterpMode, RegexMatcher
+from .columnar import ColumnarObjects
 
 
 class ExcellonContext:
@@ -301,7 +302,7 @@ class ExcellonFile(CamFile):
             self.import_settings = None
 
     @classmethod
-    def open(kls, filename, plated=None, settings=None, external_tools=None):
+    def open(kls, filename, plated=None, settings=None, external_tools=None, cache=None):
         """ Load an Excellon file from the file system.
 
         Certain CAD tools do not put any information on decimal points into the actual excellon file, and instead put
@@ -317,9 +318,16 @@ class ExcellonFile(CamFile):
                 useful if you already know that this file contains only e.g. plated holes from contextual information
                 such as the file name.
         :param FileSettings settings: Format settings to use. If None, try to auto-detect file settings.
+        :param cache: :py:class:`.ParseCache` to look up the parse result in, and to store it into.
         """
 
         filename = Path(filename)
+        if cache is not None:
+            sidecar_files = [filename.parent / 'nc_param.txt', filename.parent / 'ncdrill.log',
+                             filename.with_suffix('.fdl')]
+            return cache.open(kls, filename, plated=plated, settings=settings, external_tools=external_tools,
+                              extra_files=sidecar_files)
+
         external_tools = None
     
         if settings is None:
@@ -438,7 +446,21 @@ class ExcellonFile(CamFile):
         with open(filename, 'wb') as f:
             f.write(self.write_to_bytes(settings, drop_comments=drop_comments))
 
+    def compact(self):
+        """ Convert :py:attr:`objects` into a :py:class:`.ColumnarObjects` store in-place, see
+        :py:meth:`.GerberFile.compact`.
+
+        :returns: ``self``
+        """
+        if not isinstance(self.objects, ColumnarObjects):
+            self.objects = ColumnarObjects(self.objects)
+        return self
+
     def offset(self, x=0, y=0, unit=MM):
+        if isinstance(self.objects, ColumnarObjects):
+            self.objects.offset(x, y, unit)
+            return
+
         for obj in self.objects:
             obj.offset(x, y, unit)
 
@@ -446,6 +468,10 @@ class ExcellonFile(CamFile):
         if math.isclose(angle % (2*math.pi), 0):
             return
 
+        if isinstance(self.objects, ColumnarObjects):
+            self.objects.rotate(angle, cx, cy, unit)
+            return
+
         for obj in self.objects:
             obj.rotate(angle, cx, cy, unit=unit)
 
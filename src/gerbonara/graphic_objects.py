@@ -765,3 +765,125 @@ class Arc(GraphicObject):
         return self.unit.convert_to(unit, math.hypot(self.cx, self.cy) * self.sweep_angle)
 
 
+
+class StepRepeat(GraphicObject):
+    """ Gerber step-and-repeat block (``SR`` statement). A step-and-repeat block places copies of a list of objects on a
+    grid. Instead of copying these objects for every instance, this class holds the objects once, together with the
+    grid. Transforms, :py:meth:`bounding_box`, SVG export (using ``<use>`` tags) and Gerber export (as an ``SR``
+    block) work on this compact representation. :py:meth:`expand` returns the actual copies of the objects for all
+    instances.
+
+    The instance at grid position ``(i, j)`` is offset by ``i`` times :py:attr:`x_step` plus ``j`` times
+    :py:attr:`y_step` from the original objects. Right after parsing, :py:attr:`x_step` is ``(I, 0)`` and
+    :py:attr:`y_step` is ``(0, J)`` with ``I`` and ``J`` from the ``SR`` statement. Rotating a step-and-repeat block
+    rotates both of them. When this block is saved to a Gerber file and the grid is no longer axis-aligned, it is
+    written out expanded since the ``SR`` statement cannot represent it.
+
+    The :py:attr:`polarity_dark` and :py:attr:`attrs` attributes of this object are ignored, each of the objects inside
+    the block has its own.
+    """
+
+    def __init__(self, objects=None, x_count=1, y_count=1, x_step=(0, 0), y_step=(0, 0), *, unit=MM):
+        #: List of the graphic objects inside this block, as they are placed for the first instance.
+        self.objects = [] if objects is None else objects
+        #: Number of instances in X direction.
+        self.x_count = x_count
+        #: Number of instances in Y direction.
+        self.y_count = y_count
+        #: ``(dx, dy)`` tuple with the offset between adjacent instances in X direction, in :py:attr:`unit` units.
+        self.x_step = x_step
+        #: ``(dx, dy)`` tuple with the offset between adjacent instances in Y direction, in :py:attr:`unit` units.
+        self.y_step = y_step
+        self.unit = unit
+        self.attrs = {}
+
+    def __str__(self):
+        return f'<StepRepeat of {len(self.objects)} objects, {self.x_count}x{self.y_count} instances at {hex(id(self))}>'
+
+    def __copy__(self):
+        # Transforms change the objects inside the block in-place, so copies must not share them.
+        return type(self)([copy.copy(obj) for obj in self.objects], self.x_count, self.y_count, self.x_step,
+                          self.y_step, unit=self.unit)
+
+    def instance_offsets(self, unit=None):
+        """ Iterate through the offsets of all instances of this block, starting with ``(0, 0)``.
+
+        :param unit: :py:class:`.LengthUnit` or str with unit for return value. Defaults to :py:attr:`unit`.
+        :rtype: Iterator[tuple[float, float]]
+        """
+        (xx, xy), (yx, yy) = self.x_step, self.y_step
+        for i in range(self.x_count):
+            for j in range(self.y_count):
+                yield self.unit.convert_to(unit, i*xx + j*yx), self.unit.convert_to(unit, i*xy + j*yy)
+
+    def expand(self):
+        """ Iterate through copies of the objects inside this block for all instances, instance by instance.
+
+        :rtype: Iterator[:py:class:`.GraphicObject`]
+        """
+        for dx, dy in self.instance_offsets():
+            for obj in self.objects:
+                obj = copy.copy(obj)
+                obj.offset(dx, dy, self.unit)
+                yield obj
+
+    def map_apertures(self, fun):
+        """ Replace the aperture of each object inside this block by ``fun(aperture)``. """
+        for obj in self.objects:
+            if (aperture := getattr(obj, 'aperture', None)):
+                obj.aperture = fun(aperture)
+
+    def convert_to(self, unit):
+        for obj in self.objects:
+            obj.convert_to(unit)
+        self.x_step = tuple(self.unit.convert_to(unit, value) for value in self.x_step)
+        self.y_step = tuple(self.unit.convert_to(unit, value) for value in self.y_step)
+        self.unit = to_unit(unit)
+
+    def offset(self, dx, dy, unit=MM):
+        for obj in self.objects:
+            obj.offset(dx, dy, unit)
+
+    def scale(self, factor, unit=MM):
+        for obj in self.objects:
+            obj.scale(factor, unit)
+        self.x_step = (self.x_step[0]*factor, self.x_step[1]*factor)
+        self.y_step = (self.y_step[0]*factor, self.y_step[1]*factor)
+
+    def rotate(self, rotation, cx=0, cy=0, unit=MM):
+        for obj in self.objects:
+            obj.rotate(rotation, cx, cy, unit)
+        self.x_step = rotate_point(*self.x_step, rotation)
+        self.y_step = rotate_point(*self.y_step, rotation)
+
+    def bounding_box(self, unit=None):
+        unit = unit or self.unit
+        if (bounds := sum_bounds(obj.bounding_box(unit) for obj in self.objects)) is None:
+            return None
+        (min_x, min_y), (max_x, max_y) = bounds
+        # The instance offsets are a linear function of the grid position, so their extremes are at the grid's corners.
+        corners = [ (self.unit.convert_to(unit, i*self.x_step[0] + j*self.y_step[0]),
+                     self.unit.convert_to(unit, i*self.x_step[1] + j*self.y_step[1]))
+                    for i in {0, self.x_count-1} for j in {0, self.y_count-1} ]
+        return ((min_x + min(x for x, _y in corners), min_y + min(y for _x, y in corners)),
+                (max_x + max(x for x, _y in corners), max_y + max(y for _x, y in corners)))
+
+    def to_primitives(self, unit=None):
+        for obj in self.expand():
+            yield from obj.to_primitives(unit)
+
+    def to_statements(self, gs):
+        (xx, xy), (yx, yy) = self.x_step, self.y_step
+        if not (math.isclose(xy, 0, abs_tol=1e-9) and math.isclose(yx, 0, abs_tol=1e-9) and xx >= 0 and yy >= 0):
+            for obj in self.expand():
+                yield from obj.to_statements(gs)
+            return
+
+        i, j = abs(gs.file_settings.unit(xx, self.unit)), abs(gs.file_settings.unit(yy, self.unit))
+        yield f'%SRX{self.x_count}Y{self.y_count}I{i:.6f}J{j:.6f}*%'
+        # Do not rely on the current point across the block boundaries.
+        gs.point = None
+        for obj in self.objects:
+            yield from obj.to_statements(gs)
+        yield '%SR*%'
+        gs.point = None
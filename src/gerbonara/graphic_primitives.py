@@ -68,6 +68,16 @@ class GraphicPrimitive:
         :rtype: bool
         """
 
+    def translated(self, dx, dy):
+        """ Return a copy of this primitive moved by the given offset.
+
+        :param float dx: X offset
+        :param float dy: Y offset
+        :rtype: :py:class:`.GraphicPrimitive`
+        """
+
+        raise NotImplementedError()
+
 
 @dataclass(frozen=True)
 class Circle(GraphicPrimitive):
@@ -93,6 +103,9 @@ class Circle(GraphicPrimitive):
     def is_zero_size(self):
         return math.isclose(self.r, 0)
 
+    def translated(self, dx, dy):
+        return type(self)(self.x+dx, self.y+dy, self.r, polarity_dark=self.polarity_dark)
+
 
 @dataclass(frozen=True)
 class ArcPoly(GraphicPrimitive):
@@ -188,6 +201,10 @@ class ArcPoly(GraphicPrimitive):
     def to_arc_poly(self):
         return self
 
+    def translated(self, dx, dy):
+        return type(self)([(x+dx, y+dy) for x, y in self.outline],
+                          [arc and (arc[0], (arc[1][0]+dx, arc[1][1]+dy)) for arc in self.arc_centers],
+                          polarity_dark=self.polarity_dark)
 
     def is_zero_size(self):
         for (x1, y1), (x2, y2), (clockwise, (cx, cy)) in self.segments:
@@ -270,6 +287,9 @@ class Line(GraphicPrimitive):
     def is_zero_size(self):
         return math.isclose(self.x1, self.x2) and math.isclose(self.y1, self.y2)
 
+    def translated(self, dx, dy):
+        return type(self)(self.x1+dx, self.y1+dy, self.x2+dx, self.y2+dy, self.width, polarity_dark=self.polarity_dark)
+
 
 @dataclass(frozen=True)
 class Arc(GraphicPrimitive):
@@ -339,6 +359,10 @@ class Arc(GraphicPrimitive):
     def is_zero_size(self):
         return False # an arc with identical start and end points is defined as a circle
 
+    def translated(self, dx, dy):
+        return type(self)(self.x1+dx, self.y1+dy, self.x2+dx, self.y2+dy, self.cx+dx, self.cy+dy, self.clockwise,
+                          self.width, polarity_dark=self.polarity_dark)
+
 
 @dataclass(frozen=True)
 class Rectangle(GraphicPrimitive):
@@ -377,3 +401,6 @@ class Rectangle(GraphicPrimitive):
     def is_zero_size(self):
         return math.isclose(self.w, 0) or math.isclose(self.h, 0)
 
+    def translated(self, dx, dy):
+        return type(self)(self.x+dx, self.y+dy, self.w, self.h, self.rotation, polarity_dark=self.polarity_dark)
+
@@ -0,0 +1,555 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2022 Jan Sebastian Götte <gerbonara@jaseg.de>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import math
+import copy
+import zlib
+import struct
+from collections import deque
+from multiprocessing import shared_memory
+from pathlib import Path
+
+import numpy as np
+
+from .utils import MM, Inch, approximate_arc
+from . import graphic_primitives as gp
+
+
+def _contour(poly, max_error):
+    """ Approximate the arcs of an :py:class:`.ArcPoly` and return its outline as a list of points. """
+    points = []
+    for (x1, y1), (x2, y2), (clockwise, (cx, cy)) in poly.segments:
+        if clockwise is None or math.dist((x1, y1), (cx, cy)) < 1e-9:
+            points.append((x1, y1))
+        else:
+            points.extend(approximate_arc(cx, cy, x1, y1, x2, y2, clockwise, max_error=max_error))
+            points.pop() # remove arc end point
+    return points
+
+
+def _fill_edges(edges, r0, c0, h, w, even_odd=False):
+    """ Scanline-fill the polygon given as ``(x0, y0, x1, y1)`` edge arrays in pixel coordinates inside the window of
+    ``h`` rows and ``w`` columns starting at pixel ``(r0, c0)``. Pixels are sampled at their centers.
+
+    For every edge, we calculate where it crosses each pixel row, and add the edge's direction (+1 or -1) at that
+    column of the row. The cumulative sum along each row then is the winding number of each pixel.
+    """
+    x0, y0, x1, y1 = edges
+    first = np.clip(np.ceil(np.minimum(y0, y1) - 0.5), r0, r0+h).astype(np.intp)
+    last = np.clip(np.ceil(np.maximum(y0, y1) - 0.5), r0, r0+h).astype(np.intp)
+    counts = last - first # zero for horizontal edges
+
+    idx = np.repeat(np.arange(len(x0)), counts)
+    rows = np.arange(len(idx)) - np.repeat(np.cumsum(counts) - counts, counts) + first[idx]
+    x = x0[idx] + (rows + 0.5 - y0[idx]) * (x1[idx] - x0[idx]) / (y1[idx] - y0[idx])
+    # Crossings left of the window count for the whole row, crossings right of it for none of it.
+    cols = np.clip(np.ceil(x - 0.5), c0, c0+w).astype(np.intp) - c0
+    direction = np.where(y1 > y0, 1, -1)[idx]
+
+    crossings = np.bincount((rows - r0) * (w+1) + cols, weights=direction, minlength=h*(w+1))
+    winding = np.cumsum(crossings.reshape(h, w+1)[:, :w], axis=1)
+    if even_odd:
+        return (winding.astype(np.intp) & 1).astype(bool)
+    return winding != 0
+
+
+def _fill_circle(circle, r0, c0, h, w):
+    cx, cy, r = circle
+    rows = np.arange(r0, r0+h)[:, None] + 0.5
+    cols = np.arange(c0, c0+w)[None, :] + 0.5
+    return (cols - cx)**2 + (rows - cy)**2 <= r**2
+
+
+def _render_shared(image, row, col, height, width, name, offset):
+    """ Worker process side of :py:meth:`TiledImage.grid`: Render the given window of ``image`` into the shared memory
+    block of the given name, starting at byte ``offset``. """
+    shm = shared_memory.SharedMemory(name)
+    try:
+        out = np.ndarray((height, width, *image.channels), dtype=image.dtype, buffer=shm.buf, offset=offset)
+        out[...] = image.render(row, col, height, width)
+        del out # release our reference to shm.buf so we can close it
+    finally:
+        shm.close()
+
+
+def _downsample(pixels):
+    """ Halve the size of an ``uint8`` image by averaging blocks of 2x2 pixels. Images of odd width or height are padded
+    by repeating their last column or row. """
+    h, w = pixels.shape[:2]
+    p = np.pad(pixels, [(0, h%2), (0, w%2)] + [(0, 0)]*(pixels.ndim-2), mode='edge').astype(np.uint16)
+    return ((p[0::2, 0::2] + p[1::2, 0::2] + p[0::2, 1::2] + p[1::2, 1::2] + 2) // 4).astype(np.uint8)
+
+
+def _bin(bounds, tile_height, tile_width, height, width):
+    """ Sort the given ``(first_row, end_row, first_col, end_col)`` pixel bounding boxes into bins on a grid of tiles of
+    the given size that covers an image of the given size. Returns a dict mapping ``(tile_row, tile_col)`` to an array
+    of the indices of all bounding boxes overlapping that tile in ascending order. """
+    b = np.clip(bounds, 0, [height, height, width, width])
+    first_row, first_col = b[:, 0] // tile_height, b[:, 2] // tile_width
+    num_rows = np.where(b[:, 1] > b[:, 0], (b[:, 1] - 1) // tile_height - first_row + 1, 0)
+    num_cols = np.where(b[:, 3] > b[:, 2], (b[:, 3] - 1) // tile_width - first_col + 1, 0)
+    counts = num_rows * num_cols
+
+    idx = np.repeat(np.arange(len(b)), counts)
+    k = np.arange(len(idx)) - np.repeat(np.cumsum(counts) - counts, counts)
+    grid_cols = -(-width // tile_width)
+    keys = (first_row[idx] + k // num_cols[idx]) * grid_cols + first_col[idx] + k % num_cols[idx]
+
+    order = np.argsort(keys, kind='stable')
+    keys, starts = np.unique(keys[order], return_index=True)
+    return {divmod(int(key), grid_cols): indices
+            for key, indices in zip(keys, np.split(idx[order], starts[1:]))}
+
+
+class TiledImage:
+    """ Base class of :py:class:`Raster` and :py:class:`Composite` containing everything related to rendering an image
+    tile by tile, optionally in a pool of worker processes, and to saving the result.
+
+    Subclasses provide :py:attr:`width`, :py:attr:`height`, :py:meth:`render`, and :py:meth:`_bin`, which sorts their
+    shapes into bins on a grid of tiles so that each worker process only gets sent the shapes visible in its tile.
+    """
+
+    #: Shape of a single pixel in the arrays returned by :py:meth:`render`, i.e. ``()`` or ``(3,)`` for RGB.
+    channels = ()
+    #: numpy dtype of the arrays returned by :py:meth:`render`.
+    dtype = bool
+    tile_size = 1024
+
+    def _bin(self, tile_height, tile_width):
+        """ Sort the shapes of this image into bins on a grid of tiles of the given size. Returns a function that takes a
+        ``(tile_row, tile_col)`` tuple and returns a copy of this image that only contains the shapes overlapping that
+        tile. """
+        raise NotImplementedError()
+
+    def _pixels(self, array):
+        """ Convert the result of :py:meth:`render` into 8-bit grayscale or RGB pixels for saving. """
+        return array
+
+    def grid(self, tile_height, tile_width, workers=None):
+        """ Render this image on a grid of tiles of the given size, and yield a ``(row, col, array)`` tuple for each tile
+        in row-major order, where ``array`` is the tile as returned by :py:meth:`render`. Tiles at the right and bottom
+        edges of the image may be smaller.
+
+        :param int workers: When given, render tiles in a pool of up to this many worker processes. Every worker only
+                            gets sent the shapes that overlap its tile. The workers return their tiles through a block
+                            of shared memory that has room for twice as many tiles as there are workers, which also
+                            limits how far rendering can get ahead of the consumer of this generator.
+        """
+        windows = [(row, col, min(tile_height, self.height-row), min(tile_width, self.width-col))
+                   for row in range(0, self.height, tile_height)
+                   for col in range(0, self.width, tile_width)]
+
+        if not workers:
+            for row, col, height, width in windows:
+                yield row, col, self.render(row, col, height, width)
+            return
+
+        from concurrent.futures import ProcessPoolExecutor
+
+        take = self._bin(tile_height, tile_width)
+        slot_size = tile_height * tile_width * math.prod(self.channels) * np.dtype(self.dtype).itemsize
+        free_slots = list(range(2*workers))
+        shm = shared_memory.SharedMemory(create=True, size=slot_size*len(free_slots))
+        try:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                pending = deque()
+                windows = iter(windows)
+                while True:
+                    while free_slots and (window := next(windows, None)):
+                        row, col, height, width = window
+                        slot = free_slots.pop()
+                        job = pool.submit(_render_shared, take((row // tile_height, col // tile_width)), *window,
+                                          shm.name, slot*slot_size)
+                        pending.append((window, slot, job))
+
+                    if not pending:
+                        break
+
+                    (row, col, height, width), slot, job = pending.popleft()
+                    job.result()
+                    tile = np.ndarray((height, width, *self.channels), dtype=self.dtype, buffer=shm.buf,
+                                      offset=slot*slot_size).copy()
+                    free_slots.append(slot)
+                    yield row, col, tile
+        finally:
+            shm.close()
+            shm.unlink()
+
+    def tiles(self, tile_size=None, workers=None):
+        """ Iterate over the image in square tiles of the given size, in row-major order. For each tile, yield a
+        ``(row, col, array)`` tuple, where ``array`` is the tile as returned by :py:meth:`render`. Tiles at the right
+        and bottom edges of the image may be smaller.
+
+        :param int tile_size: Default: :py:attr:`tile_size`
+        :param int workers: Render tiles in a pool of this many worker processes, see :py:meth:`grid`.
+        """
+        tile_size = tile_size or self.tile_size
+        yield from self.grid(tile_size, tile_size, workers)
+
+    def bands(self, band_height=None, workers=None):
+        """ Iterate over the image in bands of full rows, yielding one :py:meth:`render` result for each.
+
+        :param int band_height: Default: :py:attr:`tile_size`
+        :param int workers: Render bands in a pool of this many worker processes, split into tiles of
+                            :py:attr:`tile_size` columns. See :py:meth:`grid`.
+        """
+        band_height = band_height or self.tile_size
+        band = None
+        for row, col, tile in self.grid(band_height, self.tile_size, workers):
+            if col == 0:
+                band = np.empty((tile.shape[0], self.width, *self.channels), dtype=self.dtype)
+            band[:, col:col+tile.shape[1]] = tile
+            if col + tile.shape[1] == self.width:
+                yield band
+
+    def to_pyramid(self, path, tile_size=256, layout='xyz', workers=None):
+        """ Save this image as a pyramid of PNG tiles for pan/zoom image viewers. The full-resolution image is rendered
+        band by band, and every zoom level is calculated from the one above it by averaging blocks of 2x2 pixels, so
+        memory use only depends on the width of the image.
+
+        With ``layout='xyz'``, tiles are saved as ``{path}/{zoom}/{x}/{y}.png`` like in web maps. Zoom level 0 is a
+        single tile containing the whole image, and the full resolution is the highest zoom level. Tiles at the right
+        and bottom edges are padded with white to the full tile size.
+
+        With ``layout='dzi'``, tiles are saved in Deep Zoom format, with a descriptor file at ``path`` (the suffix
+        ``.dzi`` is added if missing) and tiles in ``{path}_files/{level}/{x}_{y}.png``. Levels go down to a single
+        pixel, and edge tiles are not padded.
+
+        :param path: Output directory (``xyz``) or descriptor file (``dzi``).
+        :param int tile_size: Size of the square tiles in pixels.
+        :param str layout: ``'xyz'`` or ``'dzi'``
+        :param int workers: Render the image in a pool of this many worker processes, see :py:meth:`grid`.
+        :returns: The highest zoom level.
+        :rtype: int
+        """
+        path = Path(path)
+        if layout == 'xyz':
+            max_level = max(0, math.ceil(math.log2(max(self.width, self.height) / tile_size)))
+            tile_dir = path
+        elif layout == 'dzi':
+            max_level = math.ceil(math.log2(max(self.width, self.height)))
+            if path.suffix != '.dzi':
+                path = path.with_name(path.name + '.dzi')
+            tile_dir = path.with_name(path.stem + '_files')
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(f'''<?xml version="1.0" encoding="UTF-8"?>
+<Image xmlns="http://schemas.microsoft.com/deepzoom/2008" Format="png" Overlap="0" TileSize="{tile_size}">
+  <Size Width="{self.width}" Height="{self.height}"/>
+</Image>
+''')
+        else:
+            raise ValueError(f'Invalid tile pyramid layout {layout!r}, must be "xyz" or "dzi".')
+
+        # Number of tile rows of each level
+        num_rows = [math.ceil(self.height / 2**(max_level-level) / tile_size) for level in range(max_level+1)]
+        pending = {}
+
+        def emit(level, tile_row, band):
+            for col in range(0, band.shape[1], tile_size):
+                tile = band[:, col:col+tile_size]
+                if layout == 'xyz':
+                    tile_h, tile_w = tile.shape[:2]
+                    tile = np.pad(tile, [(0, tile_size - tile_h), (0, tile_size - tile_w)] + [(0, 0)]*(tile.ndim-2),
+                                  constant_values=255)
+                    out = tile_dir / str(level) / str(col // tile_size) / f'{tile_row}.png'
+                else:
+                    out = tile_dir / str(level) / f'{col // tile_size}_{tile_row}.png'
+                out.parent.mkdir(parents=True, exist_ok=True)
+                write_png(out, tile.shape[1], tile.shape[0], [tile])
+
+            if level == 0:
+                return
+            if tile_row % 2 == 0 and tile_row+1 < num_rows[level]:
+                pending[level] = band
+            elif tile_row % 2 == 0:
+                emit(level-1, tile_row // 2, _downsample(band))
+            else:
+                emit(level-1, tile_row // 2, _downsample(np.concatenate([pending.pop(level), band])))
+
+        for tile_row, band in enumerate(self.bands(tile_size, workers)):
+            emit(max_level, tile_row, self._pixels(band))
+        return max_level
+
+
+class Raster(TiledImage):
+    """ Bitmap rendering of a list of :py:class:`.GraphicPrimitive` instances, such as the ones returned by
+    :py:meth:`.GraphicObject.to_primitives`. Usually, you get one of these from :py:meth:`.CamFile.to_raster`.
+
+    Primitives are painted in order. Dark primitives set pixels, and clear primitives reset them. Pixels are sampled at
+    their centers without anti-aliasing. Like in image files, row 0 is at the top of the image, i.e. at the maximum Y
+    coordinate.
+
+    The constructor only converts all primitives to polygons. The pixels are calculated by :py:meth:`render`,
+    :py:meth:`tiles` or :py:meth:`to_png` one tile at a time, so that memory use stays bounded even for large panels at
+    high resolutions.
+
+    .. note:: This class requires numpy.
+
+    :param primitives: Iterable of :py:class:`.GraphicPrimitive` in the given unit.
+    :param bounds: ``((min_x, min_y), (max_x, max_y))`` tuple of the area to render in the given unit.
+    :param float dpi: Resolution in pixels per inch.
+    :param unit: :py:class:`.LengthUnit` of ``primitives`` and ``bounds``.
+    :param bool even_odd: Combine all primitives into a single shape using the even-odd rule, like SVG's
+                          ``fill-rule="evenodd"``. This is useful for rendering board outlines with cutouts.
+    :param int tile_size: Size of the square tiles :py:meth:`render` calculates pixels in.
+    """
+
+    def __init__(self, primitives, bounds, dpi=600, unit=MM, even_odd=False, tile_size=1024):
+        (self.min_x, self.min_y), (self.max_x, self.max_y) = bounds
+        self.dpi = dpi
+        self.unit = unit
+        self.tile_size = tile_size
+        #: Size of one pixel in :py:attr:`unit`
+        self.pixel_size = Inch.convert_to(unit, 1) / dpi
+        #: Width of the image in pixels
+        self.width = max(1, math.ceil((self.max_x - self.min_x) / self.pixel_size - 1e-6))
+        #: Height of the image in pixels
+        self.height = max(1, math.ceil((self.max_y - self.min_y) / self.pixel_size - 1e-6))
+
+        self._shapes = []
+        self._bounds = []
+        if even_odd:
+            contours = [self._contour(prim) for prim in primitives]
+            if contours:
+                self._add_polygon(contours, True, True)
+        else:
+            for prim in primitives:
+                self._add(prim)
+        self._bounds = np.array(self._bounds, dtype=np.intp).reshape(-1, 4)
+
+    def _to_pixels(self, points):
+        points = np.array(points, dtype=float).reshape(-1, 2)
+        return (points[:, 0] - self.min_x) / self.pixel_size, (self.max_y - points[:, 1]) / self.pixel_size
+
+    def _contour(self, prim):
+        return _contour(prim.to_arc_poly(), self.pixel_size/4)
+
+    def _add(self, prim):
+        if isinstance(prim, gp.Circle):
+            if prim.r <= 0:
+                return
+            (cx,), (cy,) = self._to_pixels([(prim.x, prim.y)])
+            r = prim.r / self.pixel_size
+            self._shapes.append((_fill_circle, (cx, cy, r), prim.polarity_dark, False))
+            self._bounds.append((math.floor(cy-r), math.ceil(cy+r)+1, math.floor(cx-r), math.ceil(cx+r)+1))
+
+        elif isinstance(prim, (gp.Line, gp.Arc)) and prim.width <= 0:
+            return # Hairlines don't cover any pixel centers
+
+        else:
+            self._add_polygon([self._contour(prim)], prim.polarity_dark, False)
+
+    def _add_polygon(self, contours, polarity_dark, even_odd):
+        edges = []
+        for contour in contours:
+            if len(contour) < 3:
+                continue
+            x, y = self._to_pixels(contour)
+            edges.append((x, y, np.roll(x, -1), np.roll(y, -1)))
+        if not edges:
+            return
+
+        edges = tuple(np.concatenate(coord) for coord in zip(*edges))
+        x, y = edges[0], edges[1]
+        self._shapes.append((_fill_edges, edges, polarity_dark, even_odd))
+        self._bounds.append((math.floor(y.min()), math.ceil(y.max())+1, math.floor(x.min()), math.ceil(x.max())+1))
+
+    def _take(self, indices):
+        """ Return a copy of this raster that only contains the shapes with the given indices. """
+        out = copy.copy(self)
+        out._shapes = [self._shapes[i] for i in indices]
+        out._bounds = self._bounds[indices]
+        return out
+
+    def _bin(self, tile_height, tile_width, mirror=False):
+        bounds = self._bounds
+        if mirror:
+            bounds = np.stack([bounds[:, 0], bounds[:, 1], self.width - bounds[:, 3], self.width - bounds[:, 2]], axis=1)
+        bins = _bin(bounds, tile_height, tile_width, self.height, self.width)
+        return lambda tile: self._take(bins.get(tile, []))
+
+    def _render_tile(self, row, col, height, width):
+        out = np.zeros((height, width), dtype=bool)
+        b = self._bounds
+        for i in np.flatnonzero((b[:, 0] < row+height) & (b[:, 1] > row) & (b[:, 2] < col+width) & (b[:, 3] > col)):
+            fill, data, polarity_dark, even_odd = self._shapes[i]
+            r0, r1 = max(row, b[i, 0]), min(row+height, b[i, 1])
+            c0, c1 = max(col, b[i, 2]), min(col+width, b[i, 3])
+
+            if fill is _fill_edges:
+                mask = fill(data, r0, c0, r1-r0, c1-c0, even_odd)
+            else:
+                mask = fill(data, r0, c0, r1-r0, c1-c0)
+
+            region = out[r0-row:r1-row, c0-col:c1-col]
+            if polarity_dark:
+                region |= mask
+            else:
+                region &= ~mask
+        return out
+
+    def render(self, row=0, col=0, height=None, width=None):
+        """ Render the given window of the image into a :py:obj:`bool` numpy array that is :py:obj:`True` where the
+        image is dark. By default, render the whole image.
+
+        :param int row: First row of the window
+        :param int col: First column of the window
+        :param int height: Number of rows of the window. Default: Up to the bottom of the image.
+        :param int width: Number of columns of the window. Default: Up to the right edge of the image.
+        :rtype: :py:class:`numpy.ndarray`
+        """
+        height = self.height - row if height is None else height
+        width = self.width - col if width is None else width
+
+        out = np.empty((height, width), dtype=bool)
+        for r in range(0, height, self.tile_size):
+            for c in range(0, width, self.tile_size):
+                h, w = min(self.tile_size, height-r), min(self.tile_size, width-c)
+                out[r:r+h, c:c+w] = self._render_tile(row+r, col+c, h, w)
+        return out
+
+    def _pixels(self, array):
+        return np.where(array, 0, 255).astype(np.uint8)
+
+    def to_png(self, file, fg='#000000', bg='#ffffff', band_height=None, workers=None):
+        """ Write this image to a PNG file. The image is rendered and written in bands of full rows, so the whole image
+        is never held in memory at once.
+
+        :param file: Path or binary file-like object to write to.
+        :param str fg: Color of dark pixels as hex color code.
+        :param str bg: Color of clear pixels as hex color code.
+        :param int workers: Render the image in a pool of this many worker processes, see :py:meth:`grid`.
+        """
+        fg, bg = np.array(parse_color(fg)[:3], dtype=np.uint8), np.array(parse_color(bg)[:3], dtype=np.uint8)
+        write_png(file, self.width, self.height,
+                  (np.where(band[:, :, None], fg, bg) for band in self.bands(band_height, workers)))
+
+
+class Composite(TiledImage):
+    """ RGB image of several :py:class:`Raster` layers stacked on top of each other, such as the one returned by
+    :py:meth:`.LayerStack.to_raster`. All layers must have the same size.
+
+    .. note:: This class requires numpy.
+
+    :param layers: List of ``(raster, color, clip)`` tuples, painted in order onto a white background. ``color`` is a
+                   6-digit or 8-digit hex color code. When ``clip`` is not :py:obj:`None`, the layer is inverted and
+                   clipped to ``clip``'s dark area, which is how solder mask layers work.
+    :param bool mirror: Mirror the image horizontally, e.g. to show the bottom side of a board.
+    :param int tile_size: Default tile size for :py:meth:`tiles` and :py:meth:`bands`.
+    """
+
+    channels = (3,)
+    dtype = np.uint8
+
+    def __init__(self, layers, mirror=False, tile_size=1024):
+        if not layers:
+            raise ValueError('Composite needs at least one layer')
+        self.layers = [(raster, parse_color(color), clip) for raster, color, clip in layers]
+        self.mirror = mirror
+        self.tile_size = tile_size
+        self.width, self.height = layers[0][0].width, layers[0][0].height
+
+    def _bin(self, tile_height, tile_width):
+        binned = [(raster._bin(tile_height, tile_width, self.mirror), color,
+                   None if clip is None else clip._bin(tile_height, tile_width, self.mirror))
+                  for raster, color, clip in self.layers]
+        def take(tile):
+            out = copy.copy(self)
+            out.layers = [(raster(tile), color, None if clip is None else clip(tile)) for raster, color, clip in binned]
+            return out
+        return take
+
+    def render(self, row=0, col=0, height=None, width=None):
+        """ Render the given window of the image into an ``uint8`` numpy array of shape ``(height, width, 3)``
+        containing RGB pixels. By default, render the whole image.
+
+        :param int row: First row of the window
+        :param int col: First column of the window
+        :param int height: Number of rows of the window. Default: Up to the bottom of the image.
+        :param int width: Number of columns of the window. Default: Up to the right edge of the image.
+        :rtype: :py:class:`numpy.ndarray`
+        """
+        height = self.height - row if height is None else height
+        width = self.width - col if width is None else width
+        if self.mirror:
+            col = self.width - col - width
+
+        rgb = np.ones((height, width, 3))
+        for raster, (*color, alpha), clip in self.layers:
+            mask = raster.render(row, col, height, width)
+            if clip is not None:
+                mask = clip.render(row, col, height, width) & ~mask
+            alpha /= 255
+            rgb[mask] = rgb[mask] * (1 - alpha) + np.array(color) / 255 * alpha
+
+        if self.mirror:
+            rgb = rgb[:, ::-1]
+        return (rgb * 255).round().astype(np.uint8)
+
+    def to_png(self, file, band_height=None, workers=None):
+        """ Write this image to a PNG file. The image is rendered and written in bands of full rows, so the whole image
+        is never held in memory at once.
+
+        :param file: Path or binary file-like object to write to.
+        :param int band_height: Number of rows to render at once. Default: :py:attr:`tile_size`
+        :param int workers: Render the image in a pool of this many worker processes, see :py:meth:`grid`.
+        """
+        write_png(file, self.width, self.height, self.bands(band_height, workers))
+
+
+def parse_color(color):
+    """ Parse a ``#rrggbb`` or ``#rrggbbaa`` hex color code into an ``(r, g, b, alpha)`` tuple with components between
+    0 and 255. """
+    if not isinstance(color, str) or not color.startswith('#') or len(color) not in (7, 9):
+        raise ValueError(f'Invalid color {color!r}, must be a hex color code such as "#ff00ea".')
+    r, g, b, *alpha = bytes.fromhex(color[1:])
+    return r, g, b, (alpha[0] if alpha else 255)
+
+
+def _png_chunk(kind, data):
+    return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+
+
+def write_png(file, width, height, bands):
+    """ Write an 8-bit grayscale or RGB PNG file from an iterable of ``uint8`` numpy arrays of full rows, each either
+    of shape ``(rows, width)`` for grayscale or ``(rows, width, 3)`` for RGB. Only one band needs to be held in memory
+    at a time.
+
+    :param file: Path or binary file-like object to write to.
+    """
+    if not hasattr(file, 'write'):
+        with open(file, 'wb') as f:
+            return write_png(f, width, height, bands)
+
+    file.write(b'\x89PNG\r\n\x1a\n')
+    compressor = zlib.compressobj()
+    header_written = False
+    for band in bands:
+        if not header_written:
+            color_type = 2 if band.ndim == 3 else 0
+            file.write(_png_chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, color_type, 0, 0, 0)))
+            header_written = True
+
+        # Prefix every row with filter type 0 (none)
+        rows = band.reshape(band.shape[0], -1)
+        data = np.hstack([np.zeros((rows.shape[0], 1), dtype=np.uint8), rows.astype(np.uint8)])
+        if (chunk := compressor.compress(data.tobytes())):
+            file.write(_png_chunk(b'IDAT', chunk))
+
+    file.write(_png_chunk(b'IDAT', compressor.flush()))
+    file.write(_png_chunk(b'IEND', b''))
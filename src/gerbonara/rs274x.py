@@ -20,8 +20,12 @@
 #
 
 import re
+import io
+import os
 import math
 import copy
+import mmap
+import contextlib
 import warnings
 from pathlib import Path
 import dataclasses
@@ -34,6 +38,16 @@ from . import graphic_primitives as gp
 from . import graphic_objects as go
 from . import apertures
 from .excellon import ExcellonFile
+from .columnar import ColumnarObjects, VIEW_CLASSES, LINE, ARC, FLASH
+
+
+# Object types that GerberFile._write_objects writes inline, including the views of ColumnarObjects.
+_WRITER_KINDS = {go.Line: LINE, go.Arc: ARC, go.Flash: FLASH, **{cls: kind for kind, cls in VIEW_CLASSES.items()}}
+
+_INTERPOLATION_MODE_STATEMENTS = {
+        InterpMode.LINEAR: 'G01*',
+        InterpMode.CIRCULAR_CW: 'G02*',
+        InterpMode.CIRCULAR_CCW: 'G03*'}
 
 
 def points_close(a, b):
@@ -46,6 +60,30 @@ def points_close(a, b):
     else:
         return math.isclose(a[0], b[0]) and math.isclose(a[1], b[1])
 
+class _ApertureInterner:
+    """ Callable that maps each aperture to the first equal aperture it has been called with. Aperture macros are
+    de-duplicated the same way, and a macro that has the same name as a different macro seen before is renamed. """
+
+    def __init__(self):
+        self.apertures, self.macros, self.names = {}, {}, set()
+
+    def __call__(self, aperture):
+        if (known := self.apertures.get(aperture)) is not None:
+            return known
+
+        if isinstance(aperture, apertures.ApertureMacroInstance):
+            macro = aperture.macro
+            if (known := self.macros.get(macro)) is not None:
+                if known is not macro:
+                    aperture = dataclasses.replace(aperture, macro=known)
+            else:
+                if macro.name in self.names:
+                    macro._reset_name()
+                self.macros[macro] = macro
+                self.names.add(macro.name)
+
+        return self.apertures.setdefault(aperture, aperture)
+
 class GerberFile(CamFile):
     """ A single gerber file.
 
@@ -72,16 +110,18 @@ class GerberFile(CamFile):
         self.layer_hints = layer_hints or []
         self.import_settings = import_settings
         self.file_attrs = file_attrs or {}
+        self._aperture_table = None
 
     def apertures(self):
         """ Iterate through all apertures in this layer. """
         found = set()
         for obj in self.objects:
-            if hasattr(obj, 'aperture'):
-                ap = obj.aperture
-                if ap not in found:
-                    found.add(ap)
-                    yield ap
+            for obj in (obj.objects if isinstance(obj, go.StepRepeat) else [obj]):
+                if hasattr(obj, 'aperture'):
+                    ap = obj.aperture
+                    if ap not in found:
+                        found.add(ap)
+                        yield ap
 
     def aperture_macros(self):
         found = set()
@@ -110,56 +150,52 @@ class GerberFile(CamFile):
             d = map_or_callable
             map_or_callable = lambda ap: d.get(ap, ap)
 
+        self._aperture_table = None
+        if isinstance(self.objects, ColumnarObjects):
+            self.objects.map_apertures(map_or_callable)
+            return
+
         for obj in self.objects:
-            if (aperture := getattr(obj, 'aperture', None)):
+            if isinstance(obj, go.StepRepeat):
+                obj.map_apertures(map_or_callable)
+            elif (aperture := getattr(obj, 'aperture', None)):
                 obj.aperture = map_or_callable(aperture)
 
     def dedup_apertures(self, settings=None):
-        """ Merge all apertures and aperture macros in this layer that result in the same Gerber definition under the
-        given :py:class:~.FileSettings:.
+        """ Merge all apertures and aperture macros in this layer that are equal (see :py:class:`.Aperture` and
+        :py:class:`.ApertureMacro`), and rename aperture macros that have the same name as a different macro.
 
-        When no explicit settings are given, uses Gerbonara's default settings.
-
-        :param settings: settings under which to de-duplicate the apertures.
+        :param settings: Ignored, apertures are compared independent of any file settings. Kept for compatibility.
         """
-
-        if settings is None:
-            settings = FileSettings.defaults()
-
-        cache = {}
-        macro_names = set()
-        def lookup(aperture):
-            nonlocal cache, settings
-            if isinstance(aperture, apertures.ApertureMacroInstance):
-                macro = aperture.macro
-                macro_def = macro.to_gerber(settings)
-                if macro_def not in cache:
-                    cache[macro_def] = macro
-
-                    if macro.name in macro_names:
-                        macro._reset_name()
-                    macro_names.add(macro.name)
-
-                else:
-                    macro = cache[macro_def]
-                    aperture = dataclasses.replace(aperture, macro=macro)
-
-            code = aperture.to_gerber(settings)
-            if code not in cache:
-                cache[code] = aperture
-
-            return cache[code]
-
-        self.map_apertures(lookup)
+        intern = _ApertureInterner()
+        self.map_apertures(intern)
+        self._aperture_table = self.objects, intern
+
+    def _aperture_interner(self):
+        """ Return a function that maps an aperture to an equal aperture already used in this file, or registers it as
+        a new one, see :py:class:`_ApertureInterner`.
+
+        The table behind this function is built once from :py:meth:`apertures`, and is then kept up to date by
+        :py:meth:`merge`. It is discarded when :py:attr:`objects` is replaced or :py:meth:`map_apertures` is called.
+        Objects that are added to :py:attr:`objects` by other means are not registered, which can only cause apertures
+        to be missed during de-duplication.
+        """
+        objects, intern = getattr(self, '_aperture_table', None) or (None, None)
+        if objects is not self.objects:
+            intern = _ApertureInterner()
+            for aperture in self.apertures():
+                intern(aperture)
+            self._aperture_table = self.objects, intern
+        return intern
 
     def to_excellon(self, plated=None, errors='raise', holes_only=False):
         """ Convert this excellon file into a :py:class:`~.excellon.ExcellonFile`. This will convert interpolated lines
         into slots, and circular aperture flashes into holes. Other features such as ``G36`` polygons or flashes with
         non-circular apertures will result in a :py:obj:`ValueError`. You can, of course, programmatically remove such
-        features from a :py:class:`GerberFile` before conversion. """
+        features from a :py:class:`GerberFile` before conversion. Step-and-repeat blocks are expanded. """
         new_objs = []
         new_tools = {}
-        for obj in self.objects:
+        for obj in self.expanded_objects():
             if holes_only and not isinstance(obj, go.Flash):
                 continue
 
@@ -196,25 +232,33 @@ class GerberFile(CamFile):
             below this layer's objects (placing them towards the beginning of the file). This setting is only relevant
             when there are overlapping objects of different polarity, otherwise the rendered result will be the same
             either way.
+
+        Apertures of ``other`` that are equal to apertures already used in this file are replaced by them. This is
+        done incrementally, so merging many files one by one does not get slower with every file. Apertures that are
+        not equal but still result in the same Gerber definition are merged when the file is saved, see
+        :py:meth:`dedup_apertures`.
         """
         if other is None:
             return
 
         other = other.to_gerber()
+        if mode not in ('above', 'below'):
+            raise ValueError(f'Invalid mode "{mode}", must be one of "above" or "below".')
 
         if not keep_settings:
             self.import_settings = None
         self.comments += other.comments
 
+        # Our own apertures are only collected during the first merge, after that only the new ones are looked up.
+        intern = self._aperture_interner()
+        other.map_apertures(intern)
+
         # Join objects
         if mode == 'below':
             self.objects = other.objects + self.objects
-        elif mode == 'above':
-            self.objects += other.objects
         else:
-            raise ValueError(f'Invalid mode "{mode}", must be one of "above" or "below".')
-
-        self.dedup_apertures()
+            self.objects += other.objects
+        self._aperture_table = self.objects, intern
 
     def dilate(self, offset, unit=MM, polarity_dark=True):
         # TODO add tests for this
@@ -223,17 +267,37 @@ class GerberFile(CamFile):
         offset_circle = apertures.CircleAperture(offset, unit=unit)
         new_objects = []
         for obj in self.objects:
+            if isinstance(obj, go.StepRepeat):
+                for proto in obj.objects:
+                    proto.polarity_dark = polarity_dark
+                obj.objects.extend([outline for proto in obj.objects if isinstance(proto, go.Region)
+                                    for outline in proto.outline_objects(offset_circle)])
+                continue
+
             obj.polarity_dark = polarity_dark
 
             # Ignore Line, Arc, Flash. Their actual dilation has already been done by dilating the apertures above.
-            if isinstance(obj, Region):
+            if isinstance(obj, go.Region):
                 new_objects.extend(obj.outline_objects(offset_circle))
 
         # it's safe to append these at the end since we compute a logical OR of opaque areas anyway.
         self.objects.extend(new_objects)
 
+    def compact(self):
+        """ Convert :py:attr:`objects` into a :py:class:`.ColumnarObjects` store in-place. This greatly reduces the
+        memory used by large files. It also makes :py:meth:`offset`, :py:meth:`rotate` and :py:meth:`scale` lazy, so that
+        a chain of transforms only touches each coordinate once, and makes :py:meth:`bounding_box` operate on whole
+        arrays at once.
+
+        :returns: ``self``
+        """
+        if not isinstance(self.objects, ColumnarObjects):
+            self.objects = ColumnarObjects(self.objects)
+        return self
+
     @classmethod
-    def open(kls, filename, enable_includes=False, enable_include_dir=None, override_settings=None):
+    def open(kls, filename, enable_includes=False, enable_include_dir=None, override_settings=None, compact=False,
+             memory_map=False, cache=None):
         """ Load a Gerber file from the file system. The Gerber standard contains this wonderful and totally not
         insecure "include file" setting. We disable it by default and do not parse Gerber includes because a) nobody
         actually uses them, and b) they're a bad idea from a security point of view. In case you actually want these,
@@ -242,27 +306,78 @@ class GerberFile(CamFile):
         :param filename: str or :py:class:`pathlib.Path`
         :param bool enable_includes: Enable Gerber ``IF`` statement includes (default *off*, recommended *off*)
         :param enable_include_dir: str or :py:class:`pathlib.Path`. Override base dir for include files.
+        :param bool compact: Store objects in a :py:class:`.ColumnarObjects` store right away, see
+                             :py:meth:`~.GerberFile.compact`.
+        :param bool memory_map: Memory-map the file instead of reading it into a string, and split it into commands on
+                                the raw bytes. Only the individual commands are decoded, so the file's content never
+                                needs to be held in memory as a whole. The file must be UTF-8 encoded, as required by
+                                the Gerber spec.
+        :param cache: :py:class:`.ParseCache` to look up the parse result in, and to store it into. Not used when
+                      ``enable_includes`` is set, since included files are not tracked.
 
         :rtype: :py:class:`.GerberFile`
         """
         filename = Path(filename)
+        if cache is not None and not enable_includes:
+            return cache.open(kls, filename, override_settings=override_settings, compact=compact,
+                              memory_map=memory_map)
+
+        if enable_includes and enable_include_dir is None:
+            enable_include_dir = filename.parent
+
+        if memory_map:
+            with open(filename, 'rb') as f:
+                # mmap refuses to map empty files
+                if os.fstat(f.fileno()).st_size == 0:
+                    data = contextlib.nullcontext(b'')
+                else:
+                    data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+                with data as data:
+                    return kls.from_string(data, enable_include_dir, filename=filename,
+                                           override_settings=override_settings, compact=compact)
+
+        with open(filename, "r") as f:
+            return kls.from_string(f.read(), enable_include_dir, filename=filename, override_settings=override_settings,
+                                   compact=compact)
+
+    @classmethod
+    def iter_objects(kls, filename, enable_includes=False, enable_include_dir=None, override_settings=None,
+                     chunk_size=1024*1024):
+        """ Iterate through the graphic objects in a Gerber file on the file system without loading the whole file into
+        memory. The file is read in chunks of ``chunk_size`` characters, and objects are yielded as soon as the parser
+        has produced them. Peak memory use is bounded by the largest region or step-repeat block in the file instead of
+        by the file's size. The objects yielded are the same that :py:meth:`~.GerberFile.open` would put into
+        :py:attr:`.GerberFile.objects`. For the meaning of the other parameters, see :py:meth:`~.GerberFile.open`.
+
+        :param filename: str or :py:class:`pathlib.Path`
+        :param int chunk_size: Number of characters to read at once.
+
+        :rtype: Iterator over :py:class:`.GraphicObject` instances
+        """
+        filename = Path(filename)
         with open(filename, "r") as f:
             if enable_includes and enable_include_dir is None:
                 enable_include_dir = filename.parent
-            return kls.from_string(f.read(), enable_include_dir, filename=filename, override_settings=override_settings)
+            parser = GerberParser(kls(), include_dir=enable_include_dir, override_settings=override_settings)
+            yield from parser.iter_objects(iter(lambda: f.read(chunk_size), ''), filename=filename)
 
     @classmethod
-    def from_string(kls, data, enable_include_dir=None, filename=None, override_settings=None):
-        """ Parse given string as Gerber file content. For the meaning of the parameters, see
+    def from_string(kls, data, enable_include_dir=None, filename=None, override_settings=None, compact=False):
+        """ Parse given string as Gerber file content. ``data`` can also be a bytes-like object such as a
+        :py:class:`mmap.mmap` containing UTF-8 encoded Gerber. For the meaning of the parameters, see
         :py:meth:`~.GerberFile.open`. """
         # filename arg is for error messages
         obj = kls()
+        if compact:
+            obj.objects = ColumnarObjects()
         parser = GerberParser(obj, include_dir=enable_include_dir, override_settings=override_settings)
         parser.parse(data, filename=filename)
         return obj
 
-    def _generate_statements(self, settings, drop_comments=True):
-        """ Export this file as Gerber code, yields one str per line. """
+    def _generate_header(self, settings, aperture_map, drop_comments=True):
+        """ Export the header of this file including all aperture definitions as Gerber code, yields one str per line.
+        """
 
         yield 'G04 Gerber file generated by Gerbonara*'
         for name, value in self.file_attrs.items():
@@ -285,10 +400,7 @@ class GerberFile(CamFile):
             for cmt in self.comments:
                 yield f'G04{cmt}*'
 
-        self.dedup_apertures()
-
         am_stmt = lambda macro: f'%AM{macro.name}*\n{macro.to_gerber(settings)}*\n%'
-        aperture_map = {ap: num for num, ap in enumerate(self.apertures(), start=10)}
 
         if settings.calculate_out_all_aperture_macros:
             adds = []
@@ -306,14 +418,106 @@ class GerberFile(CamFile):
             for aperture, number in aperture_map.items():
                 yield f'%ADD{number}{aperture.to_gerber(settings)}*%'
 
+    def _write_statements(self, out, settings, drop_comments=True):
+        """ Export this file as Gerber code into the given text stream. """
+
+        self.dedup_apertures()
+        aperture_map = {ap: num for num, ap in enumerate(self.apertures(), start=10)}
+
+        for line in self._generate_header(settings, aperture_map, drop_comments=drop_comments):
+            out.write(line)
+            out.write('\n')
+
         def warn(msg, kls=SyntaxWarning):
             warnings.warn(msg, kls)
 
         gs = GraphicsState(warn=warn, aperture_map=aperture_map, file_settings=settings)
-        for primitive in self.objects:
-            yield from primitive.to_statements(gs)
+        self._write_objects(out, gs)
+        out.write('M02*')
+
+    def _write_objects(self, out, gs):
+        """ Export this file's objects as Gerber code into the given text stream.
+
+        Lines, arcs and flashes are written inline, with the number formatter looked up once for the whole file, and
+        without unit conversion for objects that already are in the file's unit. All other objects are written through
+        their :py:meth:`~.GraphicObject.to_statements` method. The output is the same in both cases. """
+
+        write = out.write
+        fmt = gs.file_settings.gerber_value_writer()
+        target = gs.file_settings.unit
+        aperture_map = gs.aperture_map
+
+        # Local copies of the graphics state. We write them back to gs before handing off to an object's to_statements,
+        # and read them back in afterwards. As in GraphicsState, the current point is in MM.
+        point, polarity_dark, mode = gs.point, gs.polarity_dark, gs.interpolation_mode
+        aperture = gs.aperture
+        aperture_id = aperture_map.get(aperture)
+
+        for obj in self.objects:
+            kind = _WRITER_KINDS.get(type(obj))
+
+            if kind is None:
+                gs.point, gs.polarity_dark, gs.interpolation_mode, gs.aperture = point, polarity_dark, mode, aperture
+                for line in obj.to_statements(gs):
+                    write(line)
+                    write('\n')
+                point, polarity_dark, mode, aperture = gs.point, gs.polarity_dark, gs.interpolation_mode, gs.aperture
+                aperture_id = aperture_map.get(aperture)
+                continue
 
-        yield 'M02*'
+            unit = obj.unit
+            same_unit = unit is target or unit is None
+            mm_unit = unit is MM or unit is None
+
+            if obj.polarity_dark != polarity_dark:
+                polarity_dark = obj.polarity_dark
+                write('%LPD*%\n' if polarity_dark else '%LPC*%\n')
+
+            if obj.aperture is not aperture:
+                aperture = obj.aperture
+                if (new_id := aperture_map[aperture]) != aperture_id:
+                    aperture_id = new_id
+                    write(f'D{aperture_id}*\n')
+
+            if kind == FLASH:
+                x, y = obj.x, obj.y
+                if same_unit:
+                    write(f'X{fmt(x)}Y{fmt(y)}D03*\n')
+                else:
+                    write(f'X{fmt(target(x, unit))}Y{fmt(target(y, unit))}D03*\n')
+                point = (x, y) if mm_unit else (MM(x, unit), MM(y, unit))
+                continue
+
+            if kind == LINE:
+                new_mode = InterpMode.LINEAR
+            else:
+                new_mode = InterpMode.CIRCULAR_CW if obj.clockwise else InterpMode.CIRCULAR_CCW
+            if new_mode != mode:
+                mode = new_mode
+                write(_INTERPOLATION_MODE_STATEMENTS[mode])
+                write('\n')
+
+            x1, y1, x2, y2 = obj.x1, obj.y1, obj.x2, obj.y2
+            start = (x1, y1) if mm_unit else (MM(x1, unit), MM(y1, unit))
+            if start != point and not points_close(point, start):
+                if same_unit:
+                    write(f'X{fmt(x1)}Y{fmt(y1)}D02*\n')
+                else:
+                    write(f'X{fmt(target(x1, unit))}Y{fmt(target(y1, unit))}D02*\n')
+
+            if not same_unit:
+                x2, y2 = target(x2, unit), target(y2, unit)
+            if kind == LINE:
+                write(f'X{fmt(x2)}Y{fmt(y2)}D01*\n')
+            else:
+                cx, cy = obj.cx, obj.cy
+                if not same_unit:
+                    cx, cy = target(cx, unit), target(cy, unit)
+                write(f'X{fmt(x2)}Y{fmt(y2)}I{fmt(cx)}J{fmt(cy)}D01*\n')
+
+            point = (obj.x2, obj.y2) if mm_unit else (MM(obj.x2, unit), MM(obj.y2, unit))
+
+        gs.point, gs.polarity_dark, gs.interpolation_mode, gs.aperture = point, polarity_dark, mode, aperture
 
     def __str__(self):
         name = f'{self.original_path.name} ' if self.original_path else ''
@@ -345,7 +549,9 @@ class GerberFile(CamFile):
                 settings.zeros = None
             else:
                 settings = FileSettings.defaults()
-        return '\n'.join(self._generate_statements(settings, drop_comments=drop_comments)).encode('utf-8')
+        out = io.StringIO()
+        self._write_statements(out, settings, drop_comments=drop_comments)
+        return out.getvalue().encode('utf-8')
 
     def __len__(self):
         return len(self.objects)
@@ -355,11 +561,19 @@ class GerberFile(CamFile):
 
         self.map_apertures(lambda ap: ap.scaled(factor))
 
+        if isinstance(self.objects, ColumnarObjects):
+            self.objects.scale(factor)
+            return
+
         for obj in self.objects:
             obj.scale(factor)
 
     def offset(self, dx=0,  dy=0, unit=MM):
         # TODO round offset to file resolution
+        if isinstance(self.objects, ColumnarObjects):
+            self.objects.offset(dx, dy, unit)
+            return
+
         for obj in self.objects:
             obj.offset(dx, dy, unit)
 
@@ -369,13 +583,38 @@ class GerberFile(CamFile):
 
         self.map_apertures(lambda ap: ap.rotated(angle))
 
+        if isinstance(self.objects, ColumnarObjects):
+            self.objects.rotate(angle, cx, cy, unit)
+            return
+
         for obj in self.objects:
             obj.rotate(angle, cx, cy, unit)
 
     def invert_polarity(self):
         """ Invert the polarity (color) of each object in this file. """
         for obj in self.objects:
-            obj.polarity_dark = not obj.polarity_dark
+            for obj in (obj.objects if isinstance(obj, go.StepRepeat) else [obj]):
+                obj.polarity_dark = not obj.polarity_dark
+
+    def expanded_objects(self):
+        """ Iterate through the objects in this file like iterating through :py:attr:`objects` does, but replace each
+        :py:class:`.StepRepeat` block by the objects of all of its instances (see :py:meth:`.StepRepeat.expand`).
+
+        :rtype: Iterator[:py:class:`.GraphicObject`]
+        """
+        for obj in self.objects:
+            if isinstance(obj, go.StepRepeat):
+                yield from obj.expand()
+            else:
+                yield obj
+
+    def expand_step_repeats(self):
+        """ Replace all :py:class:`.StepRepeat` blocks in :py:attr:`objects` by the objects of all of their instances.
+        Note that this can take a lot of memory for large panels. """
+        expanded = list(self.expanded_objects())
+        if isinstance(self.objects, ColumnarObjects):
+            expanded = ColumnarObjects(expanded)
+        self.objects = expanded
 
 
 class GraphicsState:
@@ -586,10 +825,7 @@ class GraphicsState:
             yield self.interpolation_mode_statement()
 
     def interpolation_mode_statement(self):
-        return {
-                InterpMode.LINEAR: 'G01*',
-                InterpMode.CIRCULAR_CW: 'G02*',
-                InterpMode.CIRCULAR_CCW: 'G03*'}[self.interpolation_mode]
+        return _INTERPOLATION_MODE_STATEMENTS[self.interpolation_mode]
 
 
 class GerberParser:
@@ -600,7 +836,6 @@ class GerberParser:
     DECIMAL = r"[\+-]?\d+([.]?\d+)?"
     NAME = r"[a-zA-Z_$\.][a-zA-Z_$\.0-9+\-]+"
     MAX_STEP_REPEAT_INSTANCES = 100000
-    MAX_STEP_REPEAT_RESULT_OBJECTS = 100000
 
     STATEMENT_REGEXES = {
         'coord': fr"(G0?[123]|G74|G75|G54|G55)?\s*(?:X\+?(-?)({NUMBER}))?(?:Y\+?(-?)({NUMBER}))?" \
@@ -639,12 +874,47 @@ class GerberParser:
         'comment': r"G0?4(?P<comment>[^*]*)",
         }
 
+    # Characters each of the statements above can start with. :py:meth:`GerberParser.parse` uses this to only try the
+    # handful of regexes that can possibly match a given statement instead of running through all of them in turn.
+    # Statements not listed here are tried on every line.
+    STATEMENT_PREFIXES = {
+        'coord': 'GXYIJD',
+        'region_start': 'G',
+        'region_end': 'G',
+        'eof': 'DM',
+        'aperture': 'GD',
+        'allegro_format_spec': 'F',
+        'unit_mode': 'M',
+        'format_spec': 'F',
+        'allegro_legacy_params': 'I',
+        'load_polarity': 'L',
+        'load_name': 'L',
+        'offset': 'O',
+        'include_file': 'I',
+        'image_name': 'I',
+        'axis_selection': 'A',
+        'image_polarity': 'I',
+        'image_rotation': 'I',
+        'mirror_image': 'M',
+        'scale_factor': 'S',
+        'aperture_definition': 'A',
+        'aperture_macro': 'A',
+        'siemens_garbage': 'I',
+        'step_repeat': 'S',
+        'old_unit': 'G',
+        'old_notation': 'G',
+        'ignored': 'M',
+        'attribute': 'GT',
+        'comment': 'G',
+        }
+
     def __init__(self, target, include_dir=None, override_settings=None):
         """ Pass an include dir to enable IF include statements (potentially DANGEROUS!). """
         self.target = target
         self.include_dir = include_dir
         self.include_stack = []
         self.file_settings = override_settings or FileSettings()
+        self.parse_value = self.file_settings.gerber_value_parser()
         self.graphics_state = GraphicsState(warn=self.warn, file_settings=self.file_settings)
         self.aperture_map = {}
         self.aperture_macros = {}
@@ -673,12 +943,91 @@ class GerberParser:
     def warn(self, msg, kls=SyntaxWarning):
         warnings.warn(f'{self.filename}:{self.lineno} "{self._shorten_line()}": {msg}', kls)
 
+    # Ignore '%' signs within G04 commments because eagle likes to put completely broken file attributes inside G04
+    # comments, and those contain % signs. Best of all, they're not even balanced.
+    COMMAND_SPLIT_REGEX = re.compile(r'G04.*?\*\s*|%.*?%\s*|[^*%]*\*\s*', re.DOTALL)
+    # The same as the above, for splitting bytes-like input.
+    COMMAND_SPLIT_REGEX_BYTES = re.compile(rb'G04.*?\*\s*|%.*?%\s*|[^*%]*\*\s*', re.DOTALL)
+    # When reading input in chunks, give up on an unterminated extended command or comment once it has grown beyond
+    # this many characters, and skip it as garbage.
+    MAX_PENDING_COMMAND_LENGTH = 1024*1024
+
+    def _iter_raw_commands(self, chunks):
+        """ Split the concatenation of the given string chunks into raw commands, yielding the same commands that
+        splitting the whole input at once would yield.
+
+        A command is only yielded once the data following it is known, since e.g. the trailing whitespace of a command
+        that ends at the end of a chunk might continue in the next chunk. Input the split regex skips over is held back
+        if it might still turn into a command given more data. That is the case if it contains a ``%`` that might be
+        the start of an extended command, or a ``G04`` that might be the start of a comment. Held-back input is only
+        re-scanned once a chunk arrives that contains a character that could terminate it. If it grows beyond
+        :py:attr:`MAX_PENDING_COMMAND_LENGTH`, it is skipped instead.
+        """
+        buf = ''
+        pending = [] # chunks that arrived while waiting for a terminator for the start of buf
+        held = 0 # len(buf) plus length of pending chunks
+        terminators = None
+
+        for chunk in chunks:
+            give_up = held > self.MAX_PENDING_COMMAND_LENGTH
+            if terminators and not give_up and not any(c in chunk for c in terminators):
+                pending.append(chunk)
+                held += len(chunk)
+                continue
+
+            buf = ''.join([buf, *pending, chunk])
+            pending, terminators = [], None
+
+            pos = 0
+            for match in self.COMMAND_SPLIT_REGEX.finditer(buf):
+                if match.start() != pos:
+                    garbage = buf[pos:match.start()]
+                    if give_up and pos == 0:
+                        warnings.warn(f'{self.filename}: Unterminated command found, ignoring '
+                                      f'{len(garbage)} characters of input.', SyntaxWarning)
+
+                    elif '%' in garbage or 'G04' in garbage:
+                        terminators = '*%' if 'G04' in garbage else '%'
+                        break
+
+                if match.end() == len(buf):
+                    break
+
+                yield match[0]
+                pos = match.end()
+
+            else:
+                if pos < len(buf):
+                    rest = buf[pos:]
+                    terminators = '*%' if 'G04' in rest else ('%' if '%' in rest else '*')
+
+            buf = buf[pos:]
+            held = len(buf)
+
+        for match in self.COMMAND_SPLIT_REGEX.finditer(''.join([buf, *pending])):
+            yield match[0]
+
+    def _iter_raw_byte_commands(self, data):
+        """ Split the given bytes-like object into raw commands like :py:meth:`_iter_raw_commands` does, decoding only
+        one command at a time. Line endings are normalized like reading the file in text mode would do. """
+        for match in self.COMMAND_SPLIT_REGEX_BYTES.finditer(data):
+            cmd = match[0].decode('utf-8')
+            if '\r' in cmd:
+                cmd = cmd.replace('\r\n', '\n').replace('\r', '\n')
+            yield cmd
+
     def _split_commands(self, data):
-        # Ignore '%' signs within G04 commments because eagle likes to put completely broken file attributes inside G04
-        # comments, and those contain % signs. Best of all, they're not even balanced.
+        """ Split input into individual commands. ``data`` can be either a :py:obj:`str`, an iterable of :py:obj:`str`
+        chunks, or a bytes-like object such as an :py:class:`mmap.mmap`. """
+        if isinstance(data, str):
+            raw_commands = self._iter_raw_commands([data])
+        elif isinstance(data, (bytes, bytearray, memoryview, mmap.mmap)):
+            raw_commands = self._iter_raw_byte_commands(data)
+        else:
+            raw_commands = self._iter_raw_commands(data)
+
         self.lineno = 1
-        for match in re.finditer(r'G04.*?\*\s*|%.*?%\s*|[^*%]*\*\s*', data, re.DOTALL):
-            cmd = match[0]
+        for cmd in raw_commands:
             newlines = cmd.count('\n')
             cmd = cmd.strip().strip('%').rstrip('*')
             if cmd:
@@ -689,33 +1038,99 @@ class GerberParser:
         self.lineno = 0
         self.line = ''
 
-    def parse(self, data, filename=None):
-        # filename arg is for error messages
-        filename = self.filename = filename or '<unknown>'
+    def _dispatch_table(self):
+        """ Compile :py:attr:`STATEMENT_REGEXES` into a dict mapping a statement's first character to the list of
+        ``(regex, handler)`` tuples that need to be tried for it, in the same order as in :py:attr:`STATEMENT_REGEXES`.
+        Also returns the list to use for characters not found in that dict.
+
+        The compiled regexes are cached per class, and the cache is rebuilt whenever :py:attr:`STATEMENT_REGEXES` or
+        :py:attr:`STATEMENT_PREFIXES` of that class have changed. Handlers are looked up on this instance, so
+        ``_parse_*`` methods overridden in a subclass or on the instance are used. """
+        kls = type(self)
+        key = (tuple(kls.STATEMENT_REGEXES.items()), tuple(kls.STATEMENT_PREFIXES.items()))
+        # Look into the class's own __dict__ so subclasses never pick up their parent's table.
+        cached = kls.__dict__.get('_dispatch_cache')
+        if cached is None or cached[0] != key:
+            compiled = [ (kls.STATEMENT_PREFIXES.get(name), re.compile(exp), name)
+                         for name, exp in kls.STATEMENT_REGEXES.items() ]
+
+            fallback = [ (le_regex, name) for prefixes, le_regex, name in compiled if prefixes is None ]
+            all_prefixes = { c for prefixes, _le_regex, _name in compiled if prefixes for c in prefixes }
+            dispatch = { c: [ (le_regex, name) for prefixes, le_regex, name in compiled
+                              if prefixes is None or c in prefixes ]
+                         for c in all_prefixes }
+            cached = kls._dispatch_cache = key, dispatch, fallback
+
+        _key, dispatch, fallback = cached
+        handlers = { name: getattr(self, f'_parse_{name}') for name in kls.STATEMENT_REGEXES }
+        bind = lambda entries: [ (le_regex, handlers[name]) for le_regex, name in entries ]
+        return { c: bind(entries) for c, entries in dispatch.items() }, bind(fallback)
 
-        regex_cache = [ (re.compile(exp), getattr(self, f'_parse_{name}')) for name, exp in self.STATEMENT_REGEXES.items() ]
+    def parse(self, data, filename=None):
+        """ Parse the given data into :py:attr:`target`. ``data`` can be either a :py:obj:`str`, an iterable of
+        :py:obj:`str` chunks, or a bytes-like object containing UTF-8 encoded Gerber. """
+        dispatch, fallback = self._start_parse(filename)
 
+        # The statement dispatch from _parse_statement is inlined here since this is the hot loop of the parser.
         for line in self._split_commands(data):
-            #if self.eof_found:
-            #    self.warn('Data found in gerber file after EOF.')
-
-            for le_regex, fun in regex_cache:
+            for le_regex, fun in dispatch.get(line[0], fallback):
                 if (match := le_regex.match(line)):
                     try:
                         fun(match)
                     except Exception as e:
-                        raise SyntaxError(f'{filename}:{self.lineno} "{self._shorten_line()}": {e}') from e
-                    line = line[match.end(0):]
+                        raise SyntaxError(f'{self.filename}:{self.lineno} "{self._shorten_line()}": {e}') from e
                     break
 
             else:
                 self.warn(f'Unknown statement found: "{self._shorten_line()}", ignoring.', UnknownStatementWarning)
                 self.target.comments.append(f'Unknown statement found: "{self._shorten_line()}", ignoring.')
-        
+
+        self._finish_parse()
+
+    def iter_objects(self, data, filename=None):
+        """ Like :py:meth:`~.GerberParser.parse`, but yield graphic objects as soon as they are complete instead of
+        collecting them in :py:attr:`target`'s ``objects`` list. Regions and step-repeat blocks are only yielded once
+        they are closed. """
+        dispatch, fallback = self._start_parse(filename)
+        objects = self.target.objects
+
+        for line in self._split_commands(data):
+            self._parse_statement(line, dispatch, fallback)
+            if objects:
+                yield from objects
+                objects.clear()
+
+        self._finish_parse()
+        yield from objects
+        objects.clear()
+
+    def _start_parse(self, filename):
+        # filename arg is for error messages
+        self.filename = filename or '<unknown>'
+        return self._dispatch_table()
+
+    def _parse_statement(self, line, dispatch, fallback):
+        for le_regex, fun in dispatch.get(line[0], fallback):
+            if (match := le_regex.match(line)):
+                try:
+                    fun(match)
+                except Exception as e:
+                    raise SyntaxError(f'{self.filename}:{self.lineno} "{self._shorten_line()}": {e}') from e
+                break
+
+        else:
+            self.warn(f'Unknown statement found: "{self._shorten_line()}", ignoring.', UnknownStatementWarning)
+            self.target.comments.append(f'Unknown statement found: "{self._shorten_line()}", ignoring.')
+
+    def _finish_parse(self):
         self.target.import_settings = self.file_settings
         self.target.unit = self.file_settings.unit
         self.target.file_attrs = self.file_attrs
-        self.target.original_path = filename
+        self.target.original_path = self.filename
+
+        if self.step_repeat_coords is not None:
+            self.warn('File ends inside of SR step-repeat block. Closing it.')
+            self._close_step_repeat()
 
         if not self.eof_found:
                     self.warn('File is missing mandatory M02 EOF marker. File may be truncated.')
@@ -745,10 +1160,11 @@ class GerberParser:
         elif interp == 'G55':
             self.generator_hints.append('zuken')
 
-        x = self.file_settings.parse_gerber_value(x)
+        parse_value = self.parse_value
+        x = parse_value(x)
         if x_s:
             x = -x
-        y = self.file_settings.parse_gerber_value(y)
+        y = parse_value(y)
         if y_s:
             y = -y
 
@@ -782,10 +1198,10 @@ class GerberParser:
                 elif self.multi_quadrant_mode:
                     self.warn('Deprecated G74 multi-quadant mode arc found. G74 is bad and you should feel bad.')
 
-            i = self.file_settings.parse_gerber_value(i)
+            i = parse_value(i)
             if i_s:
                 i = -i
-            j = self.file_settings.parse_gerber_value(j)
+            j = parse_value(j)
             if j_s:
                 j = -j
 
@@ -793,7 +1209,7 @@ class GerberParser:
                 # in multi-quadrant mode this may return None if start and end point of the arc are the same.
                 obj = self.graphics_state.interpolate(x, y, i, j, multi_quadrant=self.multi_quadrant_mode)
                 if obj is not None:
-                    if self.step_repeat_objects:
+                    if self.step_repeat_objects is not None:
                         self.step_repeat_objects.append(obj)
                     else:
                         self.target.objects.append(obj)
@@ -807,7 +1223,7 @@ class GerberParser:
             if self.current_region:
                 # Start a new region for every outline. As gerber has no concept of fill rules or winding numbers,
                 # it does not make a graphical difference, and it makes the implementation slightly easier.
-                if self.step_repeat_objects:
+                if self.step_repeat_objects is not None:
                     self.step_repeat_objects.append(self.current_region)
                 else:
                     self.target.objects.append(self.current_region)
@@ -818,7 +1234,7 @@ class GerberParser:
         elif op == '3':
             if self.current_region is None:
                 obj = self.graphics_state.flash(x, y) 
-                if self.step_repeat_objects:
+                if self.step_repeat_objects is not None:
                     self.step_repeat_objects.append(obj)
                 else:
                     self.target.objects.append(obj)
@@ -900,6 +1316,9 @@ class GerberParser:
         else:
             self.file_settings.number_format = int(match['x'][0]), int(match['x'][1])
 
+        # Coordinates are only parsed after the format spec, so pick the matching parser here.
+        self.parse_value = self.file_settings.gerber_value_parser()
+
     def _parse_unit_mode(self, match):
         if self.file_settings.unit is not None:
             self.warn('Re-definition of file units. Ignoring.')
@@ -932,14 +1351,16 @@ class GerberParser:
     def _parse_include_file(self, match):
         if self.include_dir is None:
             self.warn('IF include statement found, but includes are deactivated.', ResourceWarning)
+            return
         else:
             self.warn('IF include statement found. Includes are activated, but is this really a good idea?', ResourceWarning)
 
-        include_file = self.include_dir / param["filename"]
+        include_dir = Path(self.include_dir).resolve()
+        include_file = include_dir / match['filename']
         # Do not check if path exists to avoid leaking existence via error message
         include_file = include_file.resolve(strict=False)
         
-        if not include_file.is_relative_to(self.include_dir):
+        if not include_file.is_relative_to(include_dir):
             raise FileNotFoundError('Attempted traversal to parent of include dir in path from IF include statement')
 
         if not include_file.is_file():
@@ -949,8 +1370,14 @@ class GerberParser:
             raise ValueError("Recusive inclusion via IF include statement.")
         self.include_stack.append(include_file)
 
+        # Parse the included file's statements in-line, then continue with the including file where we left off.
+        outer_position = self.filename, self.lineno, self.line
+        self.filename = include_file.name
+        dispatch, fallback = self._dispatch_table()
         # Spec 2020-09 section 3.1: Gerber files must use UTF-8
-        self._parse(f.read_text(encoding='UTF-8'), filename=include_file.name)
+        for line in self._split_commands(include_file.read_text(encoding='UTF-8')):
+            self._parse_statement(line, dispatch, fallback)
+        self.filename, self.lineno, self.line = outer_position
         self.include_stack.pop()
 
     def _parse_image_name(self, match):
@@ -1048,7 +1475,10 @@ class GerberParser:
             raise SyntaxError('Region end command (G37) outside of region')
         
         if self.current_region: # ignore empty regions
-            self.target.objects.append(self.current_region)
+            if self.step_repeat_objects is not None:
+                self.step_repeat_objects.append(self.current_region)
+            else:
+                self.target.objects.append(self.current_region)
         self.current_region = None
 
     def _parse_old_unit(self, match):
@@ -1104,18 +1534,20 @@ class GerberParser:
             self.step_repeat_objects = []
 
         else:
-            x, y, i, j = self.step_repeat_coords
-            if len(self.step_repeat_objects) * x * y > self.MAX_STEP_REPEAT_RESULT_OBJECTS:
-                raise SyntaxError('SR step-repeat expands to too many objects')
-
-            for obj in self.step_repeat_objects:
-                for nx in range(x):
-                    for ny in range(y):
-                        new_obj = copy.copy(obj)
-                        new_obj.offset(i * nx, j * ny)
-                        self.target.objects.append(new_obj)
-            self.step_repeat_coords = None
-            self.step_repeat_objects = None
+            if self.step_repeat_coords is None:
+                raise SyntaxError('SR step-repeat end without matching SR start')
+            self._close_step_repeat()
+
+    def _close_step_repeat(self):
+        x, y, i, j = self.step_repeat_coords
+        objects = self.step_repeat_objects
+        self.step_repeat_coords = None
+        self.step_repeat_objects = None
+
+        if x == 1 and y == 1:
+            self.target.objects.extend(objects)
+        elif objects:
+            self.target.objects.append(go.StepRepeat(objects, x, y, (i, 0), (0, j), unit=self.file_settings.unit))
 
     def _parse_eof(self, match):
         self.eof_found = True
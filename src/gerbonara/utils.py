@@ -150,6 +150,10 @@ class LengthUnit:
     def __deepcopy__(self, memo):
         return self
 
+    def __reduce__(self):
+        # Unpickle as a reference to the global instance
+        return 'Inch' if self is Inch else 'MM'
+
     def __str__(self):
         return self.shorthand
 
@@ -19,6 +19,7 @@
 #
 
 import math
+import pickle
 import operator as op
 from contextlib import contextmanager
 
@@ -239,6 +240,53 @@ def test_macro_formulas(tmpfile, img_support, abc):
     run_aperture_macro_test(tmpfile, img_support, inst)
 
 
+def test_aperture_equality():
+    mm = RectangleAperture(2.54, 1.27, unit=MM)
+    inch = RectangleAperture(0.1, 0.05, unit=Inch)
+    assert mm == inch and hash(mm) == hash(inch)
+    assert mm == RectangleAperture(2.54 + 1e-9, 1.27, unit=MM)
+    assert mm != RectangleAperture(2.55, 1.27, unit=MM)
+    assert mm != ObroundAperture(2.54, 1.27, unit=MM)
+    assert mm != RectangleAperture(2.54, 1.27, unit=MM, attrs=(('.AperFunction', ('ComponentPad',)),))
+    assert len({mm, inch, RectangleAperture(2.54, 1.27, unit=MM, original_number=12)}) == 1
+
+    # Parameters of macro instances are not converted since we do not know which of them are lengths.
+    circle = am.GenericMacros.circle(1.0, unit=MM)
+    assert circle == am.GenericMacros.circle(1.0 + 1e-10, unit=MM)
+    assert circle != am.GenericMacros.circle(1.0, unit=Inch)
+
+def test_macro_equality():
+    settings = FileSettings(unit=MM)
+    body = '1,1,2.54,0,0*21,1,2.54,1.27,0,0,0'
+    macro_mm = am.ApertureMacro.parse_macro('FOO', body, MM)
+    macro_inch = am.ApertureMacro.parse_macro('BAR', macro_mm.to_gerber(FileSettings(unit=Inch)), Inch)
+    assert macro_mm == macro_inch and hash(macro_mm) == hash(macro_inch)
+    assert macro_mm != am.ApertureMacro.parse_macro('FOO', body.replace('2.54', '2.55'), MM)
+
+    gbr = GerberFile()
+    gbr.objects = [Flash(i, 0, ApertureMacroInstance(macro, unit=MM), unit=MM) for i, macro in enumerate([macro_mm, macro_inch, macro_mm])]
+    gbr.dedup_apertures(settings)
+    assert len({id(obj.aperture) for obj in gbr.objects}) == 1
+    assert len(list(gbr.aperture_macros())) == 1
+
+@pytest.mark.parametrize('unit', [None, MM, Inch])
+def test_compiled_macro(unit):
+    body = '$4=$2-0.1*1,1,$1,0,0*21,1,$1x2,$4,0.5,0,$3*4,1,3,0,0,$2,0,$2,$2,0,0,30*5,1,6,0,0,$1,15*7,0,0,1,0.5,0.1,0'
+    macro = am.ApertureMacro.parse_macro('FOO', body, MM)
+    parameters = (1.2, 2.5, 30)
+    binding = dict(enumerate(parameters, start=1))
+    expected = [prim for primitive in macro.primitives
+                for prim in primitive.to_graphic_primitives((1, 2), 0.3, binding, unit, polarity_dark=False)]
+    assert list(macro.to_graphic_primitives((1, 2), 0.3, parameters, unit, polarity_dark=False)) == expected
+    assert macro.compiled(unit) is macro.compiled(unit)
+
+    compiled = pickle.loads(pickle.dumps(macro.compiled(unit)))
+    assert [vars(calc) for calc in compiled(parameters)] == [vars(calc) for calc in macro.compiled(unit)(parameters)]
+
+    with pytest.raises(IndexError):
+        compiled(parameters[:2])
+
+
 # =============================================================================
 # Expression language unit tests
 # =============================================================================
@@ -390,6 +438,7 @@ def test_expression_against_python(f, binding):
     """Build a gerbonara expression and compare its result to Python's evaluation."""
     a, b, c = binding.get(1, 0), binding.get(2, 0), binding.get(3, 0)
     assert f(P(1), P(2), P(3)).calculate(binding) == pytest.approx(f(a, b, c), rel=1e-9, abs=1e-12)
+    assert eval(f(P(1), P(2), P(3)).to_python(), {'p': binding}) == pytest.approx(f(a, b, c), rel=1e-9, abs=1e-12)
 
 
 class TestConstantFolding:
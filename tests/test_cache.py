@@ -0,0 +1,143 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2022 Jan Sebastian Götte <gerbonara@jaseg.de>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import os
+import shutil
+import warnings
+from zipfile import ZipFile
+
+import pytest
+
+from .utils import *
+from gerbonara.cache import ParseCache
+from gerbonara.cam import FileSettings
+from gerbonara.layers import LayerStack
+from gerbonara.rs274x import GerberFile
+from gerbonara.excellon import ExcellonFile
+
+
+def no_parsing(monkeypatch):
+    def fail(*args, **kwargs):
+        raise AssertionError('File was parsed even though it should have been loaded from the cache')
+    monkeypatch.setattr(GerberFile, 'from_string', fail)
+    monkeypatch.setattr(ExcellonFile, 'from_string', fail)
+
+
+@filter_syntax_warnings
+@pytest.mark.parametrize('compact', [False, True])
+def test_gerber_cache(tmp_path, monkeypatch, compact):
+    cache = ParseCache(tmp_path / 'cache')
+    path = tmp_path / 'test.gbr'
+    shutil.copy(reference_path('eagle_files/copper_bottom_l4.gbr'), path)
+
+    expected = GerberFile.open(path, compact=compact)
+    assert GerberFile.open(path, cache=cache, compact=compact).write_to_bytes() == expected.write_to_bytes()
+    assert len(list(cache.directory.iterdir())) == 1
+
+    with monkeypatch.context() as m:
+        no_parsing(m)
+        cached = GerberFile.open(path, cache=cache, compact=compact)
+        assert cached.write_to_bytes() == expected.write_to_bytes()
+        assert cached.original_path == path
+
+        # The file's location does not matter, only its content.
+        moved = tmp_path / 'moved.gbr'
+        path.rename(moved)
+        assert GerberFile.open(moved, cache=cache, compact=compact).original_path == moved
+
+    # Different content or settings are a cache miss.
+    moved.write_bytes(moved.read_bytes().replace(b'M02*', b'D10*\nX0Y0D03*\nM02*'))
+    GerberFile.open(moved, cache=cache, compact=compact)
+    GerberFile.open(moved, cache=cache, compact=compact, override_settings=FileSettings(number_format=(2, 4)))
+    assert len(list(cache.directory.iterdir())) == 3
+
+
+def test_warnings_replayed(tmp_path):
+    cache = ParseCache(tmp_path / 'cache')
+    path = tmp_path / 'test.gbr'
+    path.write_text('%FSLAX26Y26*%\n%MOMM*%\n%ADD10C,0.1*%\nD10*\nX0Y0D03*\n')
+
+    for _ in range(2):
+        with pytest.warns(SyntaxWarning, match='missing mandatory M02'):
+            GerberFile.open(path, cache=cache)
+
+
+def test_excellon_cache(tmp_path, monkeypatch):
+    cache = ParseCache(tmp_path / 'cache')
+    for fn in ['08_057494d.rou', 'nc_param.txt', 'ncdrill.log']:
+        shutil.copy(reference_path('allegro') / fn, tmp_path / fn)
+    path = tmp_path / '08_057494d.rou'
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        expected = ExcellonFile.open(path)
+        ExcellonFile.open(path, cache=cache)
+
+        with monkeypatch.context() as m:
+            no_parsing(m)
+            assert ExcellonFile.open(path, cache=cache).write_to_bytes() == expected.write_to_bytes()
+
+        # Parameter files next to the drill file are part of the key.
+        with open(tmp_path / 'ncdrill.log', 'a') as f:
+            f.write('\n')
+        ExcellonFile.open(path, cache=cache)
+    assert len(list(cache.directory.iterdir())) == 2
+
+
+@filter_syntax_warnings
+def test_layer_stack_zip_cache(tmp_path, monkeypatch):
+    cache = ParseCache(tmp_path / 'cache')
+    zip_path = tmp_path / 'fritzing.zip'
+    with ZipFile(zip_path, 'w') as f:
+        for path in reference_path('fritzing').iterdir():
+            f.write(path, path.name)
+
+    expected = LayerStack.open(zip_path)
+    LayerStack.open(zip_path, cache=cache)
+
+    with monkeypatch.context() as m:
+        no_parsing(m)
+        cached = LayerStack.open(zip_path, cache=cache)
+
+    assert list(cached.graphic_layers) == list(expected.graphic_layers)
+    for key, layer in expected.graphic_layers.items():
+        assert cached.graphic_layers[key].write_to_bytes() == layer.write_to_bytes()
+    assert [l.write_to_bytes() for l in cached.drill_layers] == [l.write_to_bytes() for l in expected.drill_layers]
+
+
+def test_eviction(tmp_path):
+    cache = ParseCache(tmp_path, max_size=2500)
+    for i, key in enumerate(['a', 'b', 'c']):
+        cache.store(key, b'x' * 1000)
+        os.utime(tmp_path / f'{key}.pickle', (i, i))
+
+    # Storing the third entry pushed the total size above the limit.
+    assert cache.load('a') is None
+    # Loading an entry makes it the most recently used one.
+    assert cache.load('b') == (b'x' * 1000, [])
+
+    cache.store('d', b'x' * 1000)
+    assert sorted(path.name for path in tmp_path.iterdir()) == ['b.pickle', 'd.pickle']
+
+    (tmp_path / 'b.pickle').write_bytes(b'garbage')
+    with pytest.warns(RuntimeWarning, match='unreadable cache entry'):
+        assert cache.load('b') is None
+    assert not (tmp_path / 'b.pickle').exists()
+
+    cache.clear()
+    assert list(tmp_path.iterdir()) == []
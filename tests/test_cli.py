@@ -72,6 +72,12 @@ class TestRender:
         assert top == without
         assert top != bottom
 
+    @pytest.mark.parametrize('reference', ['eagle_files'], indirect=True)
+    def test_png(self, reference, tmpfile):
+        out = tmpfile('PNG output', '.png')
+        self.invoke(tmpfile('Standard output', '.txt'), reference, '--warnings=ignore', '--png', '--dpi=100', out)
+        assert out.read_bytes().startswith(b'\x89PNG')
+
     @pytest.mark.parametrize('reference', ['kicad-older'], indirect=True)
     def test_margin(self, reference, tmpfile):
         no_margin = BeautifulSoup(self.invoke(tmpfile('Without margin', '.svg'), reference, '--top', '--warnings=ignore'), features='xml')
@@ -28,7 +28,7 @@ from gerbonara.graphic_objects import Arc, Flash, Line
 
 from .image_support import *
 from .utils import *
-from gerbonara.utils import Inch, MM
+from gerbonara.utils import Inch, MM, sum_bounds
 
 REFERENCE_FILES = {
         'easyeda/Gerber_Drill_NPTH.DRL': (('inch', 'leading', 4), None),
@@ -146,6 +146,27 @@ def test_idempotence(reference, tmpfile):
     assert tmp_1.read_text() == tmp_2.read_text()
 
 
+@filter_syntax_warnings
+@pytest.mark.parametrize('reference', list(REFERENCE_FILES.items()), indirect=True)
+def test_bounding_box_vectorized(reference):
+    reference, (unit_spec, _) = reference
+    f = ExcellonFile.open(reference)
+    assert f.bounding_box(MM) == sum_bounds(obj.bounding_box(MM) for obj in f.objects)
+
+@filter_syntax_warnings
+@pytest.mark.parametrize('reference', list(REFERENCE_FILES.items()), indirect=True)
+def test_compact_transforms(reference):
+    reference, (unit_spec, _) = reference
+    expected = ExcellonFile.open(reference)
+    compact = ExcellonFile.open(reference).compact()
+
+    for f in expected, compact:
+        f.offset(10, -5, MM)
+        f.rotate(math.radians(60), 5, 5, MM)
+
+    assert compact.write_to_bytes() == expected.write_to_bytes()
+    assert sum(compact.bounding_box(MM), ()) == pytest.approx(sum(expected.bounding_box(MM), ()))
+
 @filter_syntax_warnings
 @pytest.mark.parametrize('reference', list(REFERENCE_FILES.items()), indirect=True)
 def test_gerber_alignment(reference, tmpfile, print_on_error):
@@ -17,7 +17,9 @@
 #
 
 from pathlib import Path
+import math
 import tempfile
+import warnings
 
 import pytest
 
@@ -25,6 +27,8 @@ from .utils import *
 from gerbonara.layers import LayerStack
 from gerbonara.rs274x import GerberFile
 from gerbonara.excellon import ExcellonFile
+from gerbonara.utils import MM
+from gerbonara import graphic_objects as go
 
 # hand-classified
 REFERENCE_DIRS = {
@@ -384,3 +388,56 @@ def test_pretty_svg_export(ref_dir):
     with tempfile.NamedTemporaryFile(suffix='.svg') as f:
         stack.to_pretty_svg()
 
+
+@pytest.mark.parametrize('ref_dir', ['Target3001', 'eagle-newer', 'fritzing'])
+def test_parallel_loading(ref_dir):
+    def load(**kwargs):
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            stack = LayerStack.open_dir(reference_path(ref_dir), **kwargs)
+        return stack, [(w.category, str(w.message)) for w in caught]
+
+    serial, serial_warnings = load()
+    parallel, parallel_warnings = load(workers=4)
+
+    assert list(parallel.graphic_layers) == list(serial.graphic_layers)
+    for key, layer in serial.graphic_layers.items():
+        assert parallel.graphic_layers[key].write_to_bytes() == layer.write_to_bytes()
+    assert [l.write_to_bytes() for l in parallel.drill_layers] == [l.write_to_bytes() for l in serial.drill_layers]
+
+    assert sorted(parallel_warnings, key=str) == sorted(serial_warnings, key=str)
+    assert load(workers=2)[1] == parallel_warnings
+
+
+@filter_syntax_warnings
+def test_panelize():
+    stack = LayerStack.open_dir(reference_path('eagle-newer'))
+    (x0, y0), (x1, y1) = stack.bounding_box(MM)
+
+    panel = stack.panelize([(x*100, y*80) for x in range(3) for y in range(2)])
+    assert [*panel.bounding_box(MM)[0], *panel.bounding_box(MM)[1]] == pytest.approx([x0, y0, x1+200, y1+80])
+    # The board itself is not modified
+    assert stack.bounding_box(MM) == ((x0, y0), (x1, y1))
+
+    for key, layer in panel.graphic_layers.items():
+        original = stack.graphic_layers[key]
+        if not original.objects:
+            continue
+
+        sr, = layer.objects
+        assert isinstance(sr, go.StepRepeat)
+        assert (sr.x_count, sr.y_count) == (3, 2)
+        assert len(list(layer.expanded_objects())) == 6 * len(original.objects)
+
+        reparsed = GerberFile.from_string(layer.write_to_bytes().decode())
+        assert [*reparsed.bounding_box(MM)[0], *reparsed.bounding_box(MM)[1]] == \
+                pytest.approx([*layer.bounding_box(MM)[0], *layer.bounding_box(MM)[1]], abs=1e-3)
+
+    for drills, original in zip(panel.drill_layers, stack.drill_layers):
+        assert len(drills.objects) == 6 * len(original.objects)
+
+    # Placements that do not form a grid are copied one by one.
+    panel = stack.panelize([(0, 0), (100, 0, math.pi/2), (17, 200)])
+    for key, layer in panel.graphic_layers.items():
+        assert not any(isinstance(obj, go.StepRepeat) for obj in layer.objects)
+        assert len(layer.objects) == 3 * len(stack.graphic_layers[key].objects)
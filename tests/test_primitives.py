@@ -27,6 +27,7 @@ import pytest
 from gerbonara.rs274x import GerberFile
 from gerbonara.graphic_objects import Line, Arc, Flash, Region
 from gerbonara.apertures import CircleAperture, RectangleAperture, ObroundAperture, PolygonAperture
+from gerbonara.aperture_macros.parse import GenericMacros
 from gerbonara.cam import FileSettings
 from gerbonara.utils import MM, Inch
 
@@ -267,3 +268,24 @@ def test_region_close():
             unit=MM)
     assert go_region.outline[-1] == go_region.outline[0]
 
+
+@pytest.mark.parametrize('aperture_type', [
+    lambda: CircleAperture(4.0, hole_dia=1.5, unit=MM),
+    lambda: RectangleAperture(4.0, 3.0, hole_dia=1.0, unit=MM),
+    lambda: ObroundAperture(4.0, 2.5, unit=Inch),
+    lambda: PolygonAperture(4.0, 6, rotation=0.3, unit=MM),
+    lambda: GenericMacros.rounded_rect(4.0, 3.0, 0.5, 1.0, 0.3),
+])
+@pytest.mark.parametrize('unit', [None, MM, Inch])
+@pytest.mark.parametrize('polarity', [True, False])
+def test_flash_template_cache(aperture_type, unit, polarity):
+    aperture = aperture_type()
+    for x, y in [(0, 0), (8, -3), (-1.5, 2)]:
+        flashed = aperture.flash(x, y, unit, polarity)
+        expected = aperture._flash_primitives(x, y, unit, polarity)
+        assert [type(prim) for prim in flashed] == [type(prim) for prim in expected]
+        for prim, ref in zip(flashed, expected):
+            assert prim.polarity_dark == ref.polarity_dark
+            assert [c for point in prim.to_arc_poly().outline for c in point] == \
+                    pytest.approx([c for point in ref.to_arc_poly().outline for c in point], abs=1e-9)
+    assert list(aperture._templates) == [(unit, polarity)]
@@ -0,0 +1,130 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2022 Jan Sebastian Götte <gerbonara@jaseg.de>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import math
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from .utils import *
+from gerbonara import graphic_primitives as gp
+from gerbonara.raster import Raster, Composite
+from gerbonara.rs274x import GerberFile
+from gerbonara.utils import MM, Inch
+
+
+# 254 dpi are exactly 0.1 mm per pixel
+BOUNDS = (0, 0), (10, 10)
+
+def test_primitives():
+    rect = gp.Rectangle(5, 5, 4, 2, 0)
+    raster = Raster([rect], BOUNDS, dpi=254)
+    assert (raster.width, raster.height) == (100, 100)
+    img = raster.render()
+    assert img.sum() == 40*20
+    # Row 0 is at the top of the board
+    assert img[40:60, 30:70].all()
+
+    circle = gp.Circle(2, 8, 1.5)
+    img = Raster([circle], BOUNDS, dpi=254).render()
+    assert img.sum() == pytest.approx(math.pi * 15**2, rel=0.02)
+    assert img[20, 20] and not img[80, 20]
+
+    line = gp.Line(2, 2, 8, 2, 1)
+    img = Raster([line], BOUNDS, dpi=254).render()
+    assert img.sum() == pytest.approx(60*10 + math.pi * 5**2, rel=0.02)
+
+    # Clear primitives only clear what was painted before them.
+    img = Raster([rect, gp.Circle(5, 5, 0.5, polarity_dark=False), gp.Circle(5, 5, 0.2)], BOUNDS, dpi=254).render()
+    assert img.sum() == pytest.approx(40*20 - math.pi * 5**2 + math.pi * 2**2, rel=0.02)
+
+    # Units are converted
+    img = Raster([gp.Rectangle(0.2, 0.2, 0.16, 0.08, 0)], ((0, 0), (0.4, 0.4)), dpi=100, unit=Inch).render()
+    assert img.shape == (40, 40) and img.sum() == 16*8
+
+
+def test_even_odd():
+    outer = gp.ArcPoly([(1, 1), (9, 1), (9, 9), (1, 9)])
+    inner = gp.ArcPoly([(3, 3), (7, 3), (7, 7), (3, 7)])
+    assert Raster([outer, inner], BOUNDS, dpi=254).render().sum() == 80*80
+    assert Raster([outer, inner], BOUNDS, dpi=254, even_odd=True).render().sum() == 80*80 - 40*40
+
+
+@filter_syntax_warnings
+@pytest.mark.parametrize('reference', ['eagle_files/copper_top_l1.gbr'], indirect=True)
+def test_tiles(reference, tmpfile):
+    raster = GerberFile.open(reference).to_raster(dpi=300, margin=1)
+    img = raster.render()
+    assert img.shape == (raster.height, raster.width)
+    assert 0.1 < img.mean() < 0.9
+
+    tiled = np.zeros_like(img)
+    for row, col, tile in raster.tiles(tile_size=100):
+        assert tile.shape[0] <= 100 and tile.shape[1] <= 100
+        tiled[row:row+tile.shape[0], col:col+tile.shape[1]] = tile
+    assert (tiled == img).all()
+    assert (raster.render(50, 70, 123, 45) == img[50:173, 70:115]).all()
+
+    out = tmpfile('PNG output', '.png')
+    raster.to_png(out, band_height=77)
+    png = np.array(Image.open(out).convert('L'))
+    assert (png == np.where(img, 0, 255)).all()
+
+@filter_syntax_warnings
+@pytest.mark.parametrize('reference', ['eagle_files/copper_top_l1.gbr'], indirect=True)
+def test_workers(reference):
+    raster = GerberFile.open(reference).to_raster(dpi=300, margin=1)
+    img = raster.render()
+
+    tiled = np.zeros_like(img)
+    for row, col, tile in raster.grid(70, 110, workers=2):
+        tiled[row:row+tile.shape[0], col:col+tile.shape[1]] = tile
+    assert (tiled == img).all()
+
+    # Both normal and mirrored composites only send the shapes of each tile to the workers
+    for mirror in False, True:
+        composite = Composite([(raster, '#ff000080', None), (raster, '#0000ff', raster)], mirror=mirror)
+        rgb = composite.render()
+        assert (rgb[:, ::-1 if mirror else 1][img] == [255, 127, 127]).all()
+        assert (rgb[~img[:, ::-1 if mirror else 1]] == [255, 255, 255]).all()
+        assert (np.concatenate(list(composite.bands(64, workers=2))) == rgb).all()
+
+
+def test_pyramid(tmp_path):
+    raster = Raster([gp.Rectangle(5, 5, 4, 2, 0)], BOUNDS, dpi=254) # 100 x 100 px
+    assert raster.to_pyramid(tmp_path / 'xyz', tile_size=32) == 2
+    assert sorted(str(p.relative_to(tmp_path / 'xyz')) for p in (tmp_path / 'xyz').glob('**/*.png')) == [
+            '0/0/0.png',
+            '1/0/0.png', '1/0/1.png', '1/1/0.png', '1/1/1.png',
+            *(f'2/{x}/{y}.png' for x in range(4) for y in range(4))]
+    img = np.array(Image.open(tmp_path / 'xyz/2/1/1.png'))
+    assert img.shape == (32, 32) and (img == np.where(raster.render(32, 32, 32, 32), 0, 255)).all()
+    # Edge tiles are padded
+    assert np.array(Image.open(tmp_path / 'xyz/2/3/3.png')).shape == (32, 32)
+    img = np.array(Image.open(tmp_path / 'xyz/0/0/0.png'))
+    assert img[:25, :25].mean() == pytest.approx(255 * (1 - 40*20 / 100**2), abs=1)
+
+    assert raster.to_pyramid(tmp_path / 'board', tile_size=64, layout='dzi', workers=2) == 7
+    assert '<Size Width="100" Height="100"/>' in (tmp_path / 'board.dzi').read_text()
+    assert np.array(Image.open(tmp_path / 'board_files/7/1_1.png')).shape == (36, 36)
+    assert np.array(Image.open(tmp_path / 'board_files/6/0_0.png')).shape == (50, 50)
+    assert np.array(Image.open(tmp_path / 'board_files/0/0_0.png')).shape == (1, 1)
+
+    with pytest.raises(ValueError):
+        raster.to_pyramid(tmp_path / 'foo', layout='osm')
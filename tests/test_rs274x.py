@@ -18,13 +18,19 @@
 # Based on https://github.com/tracespace/tracespace
 #
 
+import sys
 import math
+import pickle
 
 from PIL import Image
 import pytest
 
-from gerbonara.rs274x import GerberFile
+from gerbonara.rs274x import GerberFile, GerberParser
 from gerbonara.cam import FileSettings
+from gerbonara.utils import UnknownStatementWarning, MM, Inch, sum_bounds
+from gerbonara.columnar import ColumnarObjects
+from gerbonara.apertures import CircleAperture
+from gerbonara import graphic_objects as go
 
 from .image_support import *
 from .utils import *
@@ -43,6 +49,28 @@ def test_attribute_without_value_is_stored_as_empty_tuple():
     parsed = GerberFile.from_string(data)
     assert parsed.file_attrs['.FlagLike'] == ()
 
+@pytest.mark.parametrize('zeros', [None, 'leading', 'trailing'])
+@pytest.mark.parametrize('number_format', [(2, 4), (2, 5), (3, 6), (4, 6), (6, 7)])
+def test_gerber_value_parser(zeros, number_format):
+    settings = FileSettings(zeros=zeros, number_format=number_format)
+    parse = settings.gerber_value_parser()
+    for value in ['', '0', '00', '1', '12', '0012', '1200', '123456', '12345678901', '1.5', '0.0001', '+12', '-12']:
+        try:
+            expected = settings.parse_gerber_value(value)
+        except ValueError:
+            with pytest.raises(ValueError):
+                parse(value)
+        else:
+            assert parse(value) == expected
+
+@pytest.mark.parametrize('zeros', [None, 'leading', 'trailing'])
+@pytest.mark.parametrize('number_format', [(2, 4), (3, 6), (4, 6), (None, None)])
+def test_gerber_value_writer(zeros, number_format):
+    settings = FileSettings(zeros=zeros, number_format=number_format)
+    write = settings.gerber_value_writer()
+    for value in [0, 0.0, -0.0, 1, -1, 0.5, -0.00001, 0.000049, 12.3456789, -12.34, 99.999999, 1234.5]:
+        assert write(value) == settings.write_gerber_value(value)
+
 # Note: We have a testcase for gitlab issues #10/#11 in therm_1.gbr, but we can't test for that at this time because
 # gerbv chokes on that gerber file and does'nt produce any output.
 REFERENCE_FILES = [ l.strip() for l in '''
@@ -386,6 +414,327 @@ def test_idempotence(reference, tmpfile):
 
         assert left == right
 
+@filter_syntax_warnings
+@pytest.mark.parametrize('reference', REFERENCE_FILES, indirect=True)
+def test_statement_dispatch(reference):
+    class LinearGerberParser(GerberParser):
+        STATEMENT_PREFIXES = {}
+
+    data = reference.read_text()
+    dispatched, linear = GerberFile(), GerberFile()
+    GerberParser(dispatched).parse(data)
+    LinearGerberParser(linear).parse(data)
+    assert dispatched.write_to_bytes() == linear.write_to_bytes()
+
+def test_statement_dispatch_table_updates():
+    data = '%FSLAX26Y26*%\n%MOMM*%\n%ADD10C,0.1*%\nD10*\nX0Y0D03*\nM02*\n'
+
+    class CustomGerberParser(GerberParser):
+        STATEMENT_REGEXES = dict(GerberParser.STATEMENT_REGEXES)
+        STATEMENT_PREFIXES = dict(GerberParser.STATEMENT_PREFIXES)
+
+    CustomGerberParser(GerberFile()).parse(data)
+
+    # Statements added after the first parse are picked up
+    seen = []
+    CustomGerberParser.STATEMENT_REGEXES = {'custom': r'Q(?P<value>[0-9]+)$', **CustomGerberParser.STATEMENT_REGEXES}
+    CustomGerberParser.STATEMENT_PREFIXES['custom'] = 'Q'
+    CustomGerberParser._parse_custom = lambda self, match: seen.append(match['value'])
+    CustomGerberParser(GerberFile()).parse(data.replace('D10*', 'D10*\nQ42*'))
+    assert seen == ['42']
+
+    # ...and do not leak into the parent class.
+    with pytest.warns(UnknownStatementWarning):
+        GerberParser(GerberFile()).parse(data.replace('D10*', 'D10*\nQ42*'))
+
+    # Handlers overridden on an instance are used.
+    parser = GerberParser(GerberFile())
+    parser._parse_eof = lambda match: seen.append('eof')
+    with pytest.warns(SyntaxWarning, match='missing mandatory M02'):
+        parser.parse(data)
+    assert seen == ['42', 'eof']
+
+@filter_syntax_warnings
+@pytest.mark.parametrize('reference', MIN_REFERENCE_FILES, indirect=True)
+@pytest.mark.parametrize('chunk_size', [1, 100, 1024*1024])
+def test_iter_objects(reference, chunk_size):
+    expected = GerberFile(objects=GerberFile.open(reference).objects)
+    streamed = GerberFile(objects=list(GerberFile.iter_objects(reference, chunk_size=chunk_size)))
+    assert expected.write_to_bytes() == streamed.write_to_bytes()
+
+STREAMING_TEST_FILE = """G04 Test file for streaming parser*
+%FSLAX26Y26*%
+%MOMM*%
+G04 #@! %TF.Part,Single*
+%AMTHERM*
+0 Test thermal macro*
+7,0,0,1.0,0.6,0.1,45*%
+%ADD10C,0.1*%
+%ADD11THERM*%
+D10*
+X0Y0D02*
+X1000000Y0D01*
+G36*
+X0Y0D02*
+X1000000Y0D01*
+X1000000Y1000000D01*
+X0Y0D01*
+G37*
+%SRX2Y3I5.0J5.0*%
+D11*
+X0Y0D03*
+G36*
+X0Y0D02*
+X500000Y0D01*
+X0Y500000D01*
+X0Y0D01*
+G37*
+%SR*%
+X2000000Y2000000D03*
+M02*
+"""
+
+def _chunk_log(chunks):
+    """ Pass through the given chunks, recording how much input has been handed out at any point. """
+    log = [0]
+    def gen():
+        for chunk in chunks:
+            log[0] += len(chunk)
+            yield chunk
+    return gen(), log
+
+@filter_syntax_warnings
+@pytest.mark.parametrize('chunk_size', [1, 7, 100])
+def test_iter_objects_yields_closed_blocks_only(chunk_size):
+    data = STREAMING_TEST_FILE
+    chunks, log = _chunk_log(data[i:i+chunk_size] for i in range(0, len(data), chunk_size))
+    yielded = [ (log[0], obj) for obj in GerberParser(GerberFile()).iter_objects(chunks) ]
+
+    region_end = data.index('G37*') + len('G37*')
+    sr_end = data.index('%SR*%') + len('%SR*%')
+    line_end = data.index('X1000000Y0D01*\nG36') + len('X1000000Y0D01*')
+
+    consumed, line = yielded[0]
+    assert isinstance(line, go.Line)
+    # The line is yielded before the file has been read up to the end of the following region
+    assert line_end <= consumed < region_end
+
+    consumed, region = yielded[1]
+    assert isinstance(region, go.Region)
+    assert region_end <= consumed < sr_end
+
+    # The step-repeat block is yielded as a whole after it is closed
+    consumed, sr = yielded[2]
+    assert isinstance(sr, go.StepRepeat)
+    assert consumed >= sr_end
+    assert (sr.x_count, sr.y_count) == (2, 3)
+    assert [type(obj) for obj in sr.objects] == [go.Flash, go.Region]
+
+    assert len(yielded) == 2 + 1 + 1
+    expected = GerberFile.from_string(data).objects
+    assert GerberFile(objects=[obj for _consumed, obj in yielded]).write_to_bytes() == \
+            GerberFile(objects=expected).write_to_bytes()
+
+@filter_syntax_warnings
+def test_iter_objects_chunk_boundaries():
+    data = STREAMING_TEST_FILE
+    expected = GerberFile.from_string(data)
+    expected_bytes = expected.write_to_bytes()
+
+    # Split the file at every position, in particular inside the G04 comment containing a % sign, and inside the
+    # aperture macro definition.
+    for i in range(len(data)):
+        target = GerberFile()
+        target.objects = list(GerberParser(target).iter_objects([data[:i], data[i:]]))
+        assert target.write_to_bytes() == expected_bytes
+        assert target.comments == expected.comments
+        assert target.file_attrs == expected.file_attrs
+
+    target = GerberFile()
+    target.objects = list(GerberParser(target).iter_objects(iter(data)))
+    assert target.write_to_bytes() == expected_bytes
+    assert target.comments == expected.comments
+
+@filter_syntax_warnings
+def test_iter_objects_unterminated_command():
+    class SmallBufferGerberParser(GerberParser):
+        MAX_PENDING_COMMAND_LENGTH = 100
+
+    header, _, body = STREAMING_TEST_FILE.partition('D10*\n')
+    flashes = ''.join(f'X{i}000000Y0D03*\n' for i in range(100))
+    data = f'{header}D11*\n%\n{flashes}M02*\n'
+
+    chunks, log = _chunk_log(data[i:i+10] for i in range(0, len(data), 10))
+    with pytest.warns(SyntaxWarning, match='Unterminated command'):
+        yielded = [ (log[0], obj) for obj in SmallBufferGerberParser(GerberFile()).iter_objects(chunks) ]
+
+    # Everything after the stray % is not held back until the end of the file.
+    assert len(yielded) == 100
+    assert yielded[0][0] < len(data) / 2
+
+@filter_syntax_warnings
+def test_iter_objects_includes(tmp_path):
+    header, _, body = STREAMING_TEST_FILE.partition('D10*\n')
+    (tmp_path / 'included.gbr').write_text(f'D10*\n{body.replace("M02*", "")}')
+    (tmp_path / 'main.gbr').write_text(f'{header}%IFincluded.gbr*%\nX3000000Y3000000D03*\nM02*\n')
+
+    expected = GerberFile.from_string(f'{header}D10*\n{body.replace("M02*", "")}X3000000Y3000000D03*\nM02*\n')
+    with pytest.warns(ResourceWarning, match='Includes are activated'):
+        objects = list(GerberFile.iter_objects(tmp_path / 'main.gbr', enable_includes=True, chunk_size=16))
+    assert GerberFile(objects=objects).write_to_bytes() == GerberFile(objects=expected.objects).write_to_bytes()
+
+    with pytest.warns(ResourceWarning, match='Includes are activated'):
+        opened = GerberFile.open(tmp_path / 'main.gbr', enable_includes=True)
+    assert GerberFile(objects=opened.objects).write_to_bytes() == GerberFile(objects=expected.objects).write_to_bytes()
+
+    with pytest.warns(ResourceWarning, match='includes are deactivated'):
+        objects = list(GerberFile.iter_objects(tmp_path / 'main.gbr', chunk_size=16))
+    assert [(obj.x, obj.y) for obj in objects] == [(3.0, 3.0)]
+
+@filter_syntax_warnings
+@pytest.mark.parametrize('reference', MIN_REFERENCE_FILES, indirect=True)
+def test_memory_map(reference):
+    expected = GerberFile.open(reference)
+    mapped = GerberFile.open(reference, memory_map=True)
+    assert mapped.write_to_bytes() == expected.write_to_bytes()
+    assert mapped.comments == expected.comments
+    assert mapped.file_attrs == expected.file_attrs
+
+@filter_syntax_warnings
+@pytest.mark.parametrize('newline', ['\n', '\r\n', '\r'])
+def test_memory_map_line_endings(tmp_path, newline):
+    expected = GerberFile.from_string(STREAMING_TEST_FILE)
+    path = tmp_path / 'test.gbr'
+    path.write_bytes(STREAMING_TEST_FILE.replace('\n', newline).encode())
+    mapped = GerberFile.open(path, memory_map=True)
+    assert mapped.write_to_bytes() == expected.write_to_bytes()
+    assert mapped.comments == expected.comments
+
+    path.write_bytes(b'')
+    with pytest.warns(SyntaxWarning, match='missing mandatory M02'):
+        assert len(GerberFile.open(path, memory_map=True).objects) == 0
+
+@filter_syntax_warnings
+@pytest.mark.parametrize('reference', MIN_REFERENCE_FILES, indirect=True)
+def test_compact(reference):
+    expected = GerberFile.open(reference)
+    compact = GerberFile.open(reference, compact=True)
+    assert isinstance(compact.objects, ColumnarObjects)
+    assert len(compact.objects) == len(expected.objects)
+    assert compact.write_to_bytes() == expected.write_to_bytes()
+    assert sum(compact.bounding_box(default=((0, 0), (0, 0))), ()) == \
+            pytest.approx(sum(expected.bounding_box(default=((0, 0), (0, 0))), ()))
+    assert pickle.loads(pickle.dumps(compact)).write_to_bytes() == expected.write_to_bytes()
+
+
+@filter_syntax_warnings
+@pytest.mark.parametrize('reference', MIN_REFERENCE_FILES, indirect=True)
+@pytest.mark.parametrize('angle', [0, 30, 90, -135])
+def test_compact_transforms(reference, angle):
+    expected = GerberFile.open(reference)
+    compact = GerberFile.open(reference).compact()
+
+    for f in expected, compact:
+        f.rotate(math.radians(angle), 10, -5)
+        f.offset(3, 4, unit=MM)
+
+    for a, b in zip(expected.objects, compact.objects, strict=True):
+        assert isinstance(b, type(a))
+        for name, value in vars(a).items():
+            if isinstance(value, float):
+                assert getattr(b, name) == pytest.approx(value, abs=1e-9)
+    assert sum(compact.bounding_box(MM), ()) == pytest.approx(sum(expected.bounding_box(MM), ()), abs=1e-9)
+
+
+@filter_syntax_warnings
+@pytest.mark.parametrize('reference', MIN_REFERENCE_FILES, indirect=True)
+@pytest.mark.parametrize('numpy', [True, False])
+def test_compact_transform_chain(reference, numpy, monkeypatch):
+    if not numpy:
+        monkeypatch.setitem(sys.modules, 'numpy', None)
+
+    expected = GerberFile.open(reference)
+    compact = GerberFile.open(reference).compact()
+
+    for f in expected, compact:
+        f.offset(-3, 2, unit=MM)
+        f.rotate(math.radians(30), 1, 2, unit=MM)
+        f.offset(0.1, 0.2, unit=Inch)
+        f.rotate(math.radians(-75), unit=Inch)
+
+    for a, b in zip(expected.objects, compact.objects, strict=True):
+        for name, value in vars(a).items():
+            if isinstance(value, float):
+                assert getattr(b, name) == pytest.approx(value, abs=1e-9)
+
+
+def test_compact_views():
+    f = GerberFile.from_string(STREAMING_TEST_FILE).compact()
+    line = next(obj for obj in f.objects if isinstance(obj, go.Line))
+
+    copied = line.converted(MM)
+    assert type(copied) is go.Line
+    line.x1 = 1234.0
+    assert f.objects[f.objects.index(line)].x1 == 1234.0
+    assert copied.x1 != 1234.0
+
+    f.objects.append(go.Flash(1, 2, copied.aperture, unit=MM))
+    assert isinstance(f.objects[-1], go.Flash)
+    assert (f.objects[-1].x, f.objects[-1].y, f.objects[-1].unit) == (1, 2, MM)
+    del f.objects[-1]
+    assert all(obj.x != 1 for obj in f.objects if isinstance(obj, go.Flash))
+
+    expected = GerberFile.open(reference_path('example_outline_with_arcs.gbr'))
+    f = GerberFile.open(reference_path('example_outline_with_arcs.gbr'), compact=True)
+    expected.scale(1.5)
+    f.scale(1.5)
+    assert f.write_to_bytes() == expected.write_to_bytes()
+
+@filter_syntax_warnings
+@pytest.mark.parametrize('reference', MIN_REFERENCE_FILES, indirect=True)
+@pytest.mark.parametrize('unit', [MM, Inch, None])
+def test_bounding_box_vectorized(reference, unit):
+    f = GerberFile.open(reference)
+    expected = sum_bounds(obj.bounding_box(unit) for obj in f.objects)
+    assert f.bounding_box(unit) == expected
+    assert f.compact().bounding_box(unit) == expected
+
+
+@filter_syntax_warnings
+def test_compact_bounding_box_cache():
+    f = GerberFile.open(reference_path('example_outline_with_arcs.gbr'), compact=True)
+    (x0, y0), (x1, y1) = f.bounding_box(MM)
+
+    f.offset(10, 0, MM)
+    assert sum(f.bounding_box(MM), ()) == pytest.approx((x0+10, y0, x1+10, y1))
+
+    line = next(obj for obj in f.objects if isinstance(obj, go.Line))
+    line.x2 = line.unit(x1 + 100, MM)
+    assert f.bounding_box(MM)[1][0] > x1 + 100
+
+    del f.objects[:]
+    assert f.bounding_box(MM, default=None) is None
+
+
+@filter_syntax_warnings
+@pytest.mark.parametrize('reference', MIN_REFERENCE_FILES, indirect=True)
+@pytest.mark.parametrize('settings', [
+    None,
+    FileSettings(unit=MM, number_format=(4, 5), zeros='leading'),
+    FileSettings(unit=Inch, number_format=(2, 6), zeros='trailing')])
+def test_write_objects(reference, settings, monkeypatch):
+    f = GerberFile.open(reference)
+    aperture = CircleAperture(0.1, unit=MM)
+    f.objects.append(go.Line(1, 2, 3, 4, aperture, unit=MM))
+    f.objects.append(go.Arc(3, 4, 1, 2, -1, -1, clockwise=False, aperture=aperture, unit=Inch))
+    f.objects.append(go.Flash(1, 2, aperture, polarity_dark=False, unit=Inch))
+    fast = f.write_to_bytes(settings)
+    assert f.compact().write_to_bytes(settings) == fast
+
+    # Compare against the output of the objects' own to_statements methods
+    monkeypatch.setattr('gerbonara.rs274x._WRITER_KINDS', {})
+    assert f.write_to_bytes(settings) == fast
+
 
 TEST_ANGLES = [90, 180, 270, 1.5, 30, 360, 1024, -30]
 TEST_OFFSETS = [(0, 0), (100, 0), (0, 100), (2, 0), (10, 100)]
@@ -654,6 +1003,120 @@ def test_step_repeat_rejects_huge_instance_counts():
     with pytest.raises(SyntaxError, match='too many instances'):
         GerberFile.from_string(data)
 
+def _macro_test_file(diameter, flash_x):
+    return '\n'.join([
+        '%MOMM*%',
+        '%FSLAX26Y26*%',
+        f'%AMTEST*1,1,{diameter},0,0*%',
+        '%ADD10TEST*%',
+        '%ADD11C,0.5*%',
+        'D10*',
+        f'X{flash_x}Y0D03*',
+        'D11*',
+        f'X{flash_x}Y1000000D03*',
+        'M02*',
+    ])
+
+@filter_syntax_warnings
+def test_merge_interns_apertures(monkeypatch):
+    target = GerberFile.from_string(_macro_test_file(0.5, 0))
+    same = GerberFile.from_string(_macro_test_file(0.5, 1000000))
+    different = GerberFile.from_string(_macro_test_file(0.8, 2000000))
+
+    def fail(*args, **kwargs):
+        raise AssertionError('merge should not serialize apertures')
+    with monkeypatch.context() as m:
+        m.setattr(GerberFile, 'dedup_apertures', fail)
+        target.merge(same)
+        target.merge(different)
+
+    assert len(target.objects) == 6
+    # Equal apertures are shared, the macro with the same name but different content is renamed.
+    assert len(list(target.apertures())) == 3
+    assert len({macro.name for macro in target.aperture_macros()}) == 2
+
+    reparsed = GerberFile.from_string(target.write_to_bytes().decode())
+    assert len(list(reparsed.apertures())) == 3
+    assert [obj.x for obj in reparsed.objects] == [0, 0, 1, 1, 2, 2]
+    assert [_flat(obj.bounding_box(MM)) for obj in reparsed.objects] == \
+            [pytest.approx(_flat(obj.bounding_box(MM))) for obj in target.objects]
+
+STEP_REPEAT_TEST_FILE = '\n'.join([
+    '%MOMM*%',
+    '%FSLAX26Y26*%',
+    '%ADD10C,0.5*%',
+    'D10*',
+    '%SRX3Y2I10.0J5.0*%',
+    'X1000000Y1000000D03*',
+    'X0Y0D02*',
+    'X2000000Y0D01*',
+    '%SR*%',
+    'X0Y0D03*',
+    'M02*',
+])
+
+def _flat(points):
+    return [ coord for point in points for coord in point ]
+
+@filter_syntax_warnings
+def test_step_repeat():
+    gbr = GerberFile.from_string(STEP_REPEAT_TEST_FILE)
+    assert len(gbr.objects) == 2
+    sr = gbr.objects[0]
+    assert isinstance(sr, go.StepRepeat)
+    assert len(sr.objects) == 2
+    assert list(sr.instance_offsets()) == [(0, 0), (0, 5), (10, 0), (10, 5), (20, 0), (20, 5)]
+
+    expanded = list(sr.expand())
+    assert len(expanded) == 12
+    assert sum_bounds(obj.bounding_box(MM) for obj in expanded) == sr.bounding_box(MM)
+    assert _flat(sr.bounding_box(MM)) == pytest.approx([-0.25, -0.25, 22.25, 6.25])
+
+    # Step-repeat blocks survive a round trip, and are written as such.
+    data = gbr.write_to_bytes()
+    assert data.count(b'%SRX3Y2I10.000000J5.000000*%') == 1
+    reparsed = GerberFile.from_string(data.decode())
+    assert _flat(reparsed.bounding_box(MM)) == pytest.approx(_flat(gbr.bounding_box(MM)))
+
+    # Expanding the blocks does not change the file's content
+    expanded_gbr = GerberFile.from_string(STEP_REPEAT_TEST_FILE)
+    expanded_gbr.expand_step_repeats()
+    assert len(expanded_gbr.objects) == 13
+    assert b'%SR' not in expanded_gbr.write_to_bytes()
+    assert _flat(expanded_gbr.bounding_box(MM)) == pytest.approx(_flat(gbr.bounding_box(MM)))
+    assert len(list(gbr.to_excellon().drills())) == 7
+
+@filter_syntax_warnings
+def test_step_repeat_transforms():
+    gbr = GerberFile.from_string(STEP_REPEAT_TEST_FILE)
+    expected = GerberFile.from_string(STEP_REPEAT_TEST_FILE)
+    expected.expand_step_repeats()
+
+    for f in (gbr, expected):
+        f.rotate(math.pi/2, 1, 2, MM)
+        f.offset(3, 4, MM)
+        f.scale(2)
+    assert _flat(gbr.bounding_box(MM)) == pytest.approx(_flat(expected.bounding_box(MM)))
+    flashes = lambda objects: sorted((round(obj.x, 6), round(obj.y, 6)) for obj in objects if isinstance(obj, go.Flash))
+    assert flashes(gbr.expanded_objects()) == flashes(expected.objects)
+
+    # A rotated grid can not be represented by an SR statement, and is written out expanded.
+    gbr.rotate(math.pi/4)
+    assert b'%SR' not in gbr.write_to_bytes()
+
+@filter_syntax_warnings
+def test_step_repeat_svg():
+    gbr = GerberFile.from_string(STEP_REPEAT_TEST_FILE)
+    svg = str(gbr.to_svg())
+    assert svg.count('<g id="sr-') == 1
+    assert svg.count('href="#sr-') == 5
+
+def test_step_repeat_unterminated():
+    with pytest.warns(SyntaxWarning, match='ends inside of SR'):
+        gbr = GerberFile.from_string(STEP_REPEAT_TEST_FILE.replace('%SR*%', ''))
+    assert isinstance(gbr.objects[0], go.StepRepeat)
+    assert len(gbr.objects[0].objects) == 3
+
 @filter_syntax_warnings
 @pytest.mark.parametrize('reference', MIN_REFERENCE_FILES, indirect=True)
 def test_invert_polarity(reference, tmpfile, img_support):